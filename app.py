@@ -1,9 +1,9 @@
 # ABANDONED PROJECT #
 import os
-from flask import Flask, render_template, request, g, redirect, url_for, session
+from flask import Flask, render_template, request, g, redirect, url_for, session, jsonify, abort
 from dotenv import load_dotenv
 import mysql.connector
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from jinja2 import Environment # Import Environment
 
@@ -11,7 +11,11 @@ from jinja2 import Environment # Import Environment
 load_dotenv()
 
 # Import core utilities
-from core.db_utils import get_db_connection, execute_query, init_db_from_schema
+from core.db_utils import get_db_connection, init_db_from_schema, get_pool_stats, get_prepared_stats, release_request_connections
+from core.cache_utils import LazySequence
+from core.response_cache import page_cache
+from core.feeds import feed_cache, entry_cache
+from core.query_stats import query_stats
 
 # Import configuration
 from config import Config
@@ -19,9 +23,11 @@ from flask_wtf.csrf import CSRFProtect # Import CSRFProtect
 
 # Import blueprints
 from platform_management.routes import platform_bp
-from platform_management.db import get_random_blogs # Import for random blogs list
+from platform_management.services import get_user_blog
+from platform_management.db import get_random_blogs, get_random_posts_from_shared_index, get_sample_pool_stats, get_blog_context_by_subdomain, blog_context_cache, owner_blog_cache # Import for random blogs list
 from blog_instance.routes import blog_bp
-from models import User # Import User from models.py
+from blog_instance.view_counts import view_counts
+from models import User, user_cache # Import User from models.py
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -38,12 +44,37 @@ def load_user(user_id):
         return user
     return None
 
+def _load_sidebar_random_posts():
+    """Loads 10 random posts for the sidebar (for all pages, including blog instances)."""
+    try:
+        random_posts = get_random_posts_from_shared_index(limit=10, time_frame_days=30)
+        print(f"[DEBUG] app.py - _load_sidebar_random_posts: Loaded {len(random_posts)} random posts.")
+        return random_posts
+    except Exception as e:
+        print(f"Error loading random posts: {e}")
+        return []
+
+def _load_sidebar_random_blogs():
+    """Loads 10 random blogs for the sidebar."""
+    try:
+        random_blogs_list = get_random_blogs(limit=10)
+        print(f"[DEBUG] app.py - _load_sidebar_random_blogs: Loaded {len(random_blogs_list)} random blogs.")
+        return random_blogs_list
+    except Exception as e:
+        print(f"Error loading random blogs: {e}")
+        return []
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
     login_manager.init_app(app)
     csrf.init_app(app) # Initialize CSRFProtect with the app
+    page_cache.init_app(app) # Full-page cache for anonymous blog pages
+    query_stats.init_app(app) # Per-request SQL counts/timings and the slow-query log
+
+    # One pooled connection per database is bound to each request (in g) and handed back here
+    app.teardown_appcontext(release_request_connections)
 
     # Database initialization is now handled by manually running initdb.py
     # The following block has been removed:
@@ -90,12 +121,7 @@ def create_app(config_class=Config):
                 # Check if the blog instance actually exists in main database
                 print(f"[DEBUG] app.py - load_blog_instance_context: Checking existence for subdomain: {subdomain_candidate}")
                 # Fetch the blog record to get its ID and owner_user_id
-                blog_record = execute_query(
-                    g.db_name, # Use the main database name
-                    "SELECT id, subdomain_name, owner_user_id FROM blogs WHERE subdomain_name = %s", # Added owner_user_id
-                    (subdomain_candidate,),
-                    one=True
-                )
+                blog_record = get_blog_context_by_subdomain(subdomain_candidate) # Cached, see platform_management.db
                 print(f"[DEBUG] app.py - load_blog_instance_context: blog_record query result: {blog_record}")
 
                 if blog_record:
@@ -141,36 +167,11 @@ def create_app(config_class=Config):
              g.blog_owner_id = None
 
 
-        # Load 10 random posts from other blogs for the sidebar (for all pages)
-        g.random_posts = []
-        # Load 10 random posts for the sidebar (for all pages, including blog instances)
-        try:
-            one_month_ago = datetime.now() - timedelta(days=30)
-            g.random_posts = execute_query(
-                os.getenv('MYSQL_DATABASE', 'calimara_db'),
-                """
-                SELECT post_title, post_link, blog_instance_subdomain
-                FROM shared_posts_index
-                WHERE post_creation_date >= %s
-                ORDER BY RAND()
-                LIMIT 10
-                """,
-                (one_month_ago.strftime('%Y-%m-%d %H:%M:%S'),),
-                many=True
-            )
-            print(f"[DEBUG] app.py - load_blog_instance_context: Loaded {len(g.random_posts)} random posts.")
-        except Exception as e:
-            print(f"Error loading random posts: {e}")
-            g.random_posts = []
-
-        # Load 10 random blogs for the sidebar
-        g.random_blogs_list = []
-        try:
-            g.random_blogs_list = get_random_blogs(limit=10)
-            print(f"[DEBUG] app.py - load_blog_instance_context: Loaded {len(g.random_blogs_list)} random blogs.")
-        except Exception as e:
-            print(f"Error loading random blogs: {e}")
-            g.random_blogs_list = []
+        # Sidebar data (10 random posts from other blogs, 10 random blogs) is lazy: the sample
+        # pools are only touched if a rendered template actually reads these values, so JSON
+        # endpoints and redirects skip them entirely.
+        g.random_posts = LazySequence(_load_sidebar_random_posts)
+        g.random_blogs_list = LazySequence(_load_sidebar_random_blogs)
 
         print(f"[DEBUG] app.py - load_blog_instance_context END: g.is_blog_instance: {g.is_blog_instance}, g.subdomain: {g.subdomain}, g.blog_id: {g.blog_id}, g.blog_owner_id: {g.blog_owner_id}, g.db_name: {g.db_name}")
 
@@ -227,13 +228,27 @@ def create_app(config_class=Config):
     @app.context_processor
     def inject_user_blog():
         """Injects the authenticated user's blog information into all templates."""
+        # Context processors only run when a template is rendered, so JSON endpoints never get here.
+        # get_user_blog memoizes per request and caches per user across requests.
         user_blog = None
         if current_user.is_authenticated:
-            # Assuming get_blog_by_owner_id is accessible here or imported
-            from platform_management.db import get_blog_by_owner_id
-            user_blog = get_blog_by_owner_id(current_user.id)
+            user_blog = get_user_blog(current_user.id)
         return {'user_blog': user_blog}
 
+    @app.route('/_internal/stats')
+    def internal_stats():
+        """Per-worker runtime stats (connection pools, caches). Only served to whitelisted IPs."""
+        if request.remote_addr not in app.config.get('STATS_ALLOWED_IPS', []):
+            abort(404)
+        return jsonify(pid=os.getpid(), db_pools=get_pool_stats(), prepared_statements=get_prepared_stats(),
+                       caches={'blog_context': blog_context_cache.stats(), 'users': user_cache.stats(),
+                               'owner_blog': owner_blog_cache.stats(), 'feeds': feed_cache.stats(),
+                               'feed_entries': entry_cache.stats()},
+                       sample_pools=get_sample_pool_stats(),
+                       page_cache=page_cache.stats(),
+                       view_counts=view_counts.stats(),
+                       queries=query_stats.stats())
+
     # The @app.route('/') for main_index_route has been removed.
     # The platform_management.routes.platform_bp.route('/') will now solely handle requests to the main domain's root.
     # The logic for redirecting an authenticated main platform user to their blog's admin dashboard
@@ -0,0 +1,76 @@
+"""Round trips and latency of loading a post page: per-piece queries vs db.get_post_page.
+
+Needs a reachable MySQL database configured as for the app (.env). Run from the project root:
+
+    python -m benchmarks.bench_post_page <subdomain> <slug> [--iterations 200]
+"""
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+import core.db_utils as db_utils
+from blog_instance import db
+from platform_management.db import get_blog_by_subdomain
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
+
+round_trips = 0
+
+def _counting_dict_cursor(conn):
+    """Wraps db_utils.dict_cursor so every cursor.execute() (one round trip) is counted."""
+    cursor = _original_dict_cursor(conn)
+    original_execute = cursor.execute
+
+    def execute(*args, **kwargs):
+        global round_trips
+        round_trips += 1
+        return original_execute(*args, **kwargs)
+
+    cursor.execute = execute
+    return cursor
+
+_original_dict_cursor = db_utils.dict_cursor
+db_utils.dict_cursor = _counting_dict_cursor
+
+def load_separately(blog_id, slug):
+    """The post page as it was loaded before: one query per piece (view count update not included)."""
+    post = db.get_post_by_slug(DB_NAME, blog_id, slug)
+    post['comments'] = db.get_approved_comments_for_post(DB_NAME, post['id'])
+    post['like_count'] = db.get_like_count_for_post(DB_NAME, post['id'])
+    post['tags'] = db.get_tags_for_post(DB_NAME, post['id'])
+    return post
+
+def load_batched(blog_id, slug):
+    return db.get_post_page(DB_NAME, blog_id, slug)
+
+def run(name, loader, blog_id, slug, iterations):
+    global round_trips
+    loader(blog_id, slug) # Warm up the connection pool
+    round_trips = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        loader(blog_id, slug)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<12} {round_trips / iterations:>6.1f} round trips/page  {elapsed / iterations * 1000:>8.3f} ms/page")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('subdomain')
+    parser.add_argument('slug')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    blog = get_blog_by_subdomain(args.subdomain)
+    if blog is None:
+        parser.error(f"No blog with subdomain '{args.subdomain}'")
+    if db.get_post_by_slug(DB_NAME, blog['id'], args.slug) is None:
+        parser.error(f"No post '{args.slug}' on blog '{args.subdomain}'")
+
+    run('separate', load_separately, blog['id'], args.slug, args.iterations)
+    run('batched', load_batched, blog['id'], args.slug, args.iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Latency of the hot queries: text protocol vs per-connection prepared statements.
+
+Runs each query marked prepared=True (blog by subdomain, post by slug...)
+with MYSQL_PREPARED_STATEMENTS off, then on; the pool hands back the same
+connection each time, so its prepared statements are reused.
+Needs a reachable MySQL database configured as for the app (.env). Run from the project root:
+
+    python -m benchmarks.bench_prepared <subdomain> <slug> [--iterations 2000]
+"""
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+import core.db_utils as db_utils
+from blog_instance import db
+from platform_management.db import get_blog_by_subdomain
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * pct / 100), len(samples) - 1)]
+
+def hot_queries(blog, post):
+    """The queries marked prepared=True, as (name, callable) pairs."""
+    return [
+        ('blog by subdomain', lambda: get_blog_by_subdomain(blog['subdomain_name'])),
+        ('user by id', lambda: db.get_user_by_id(DB_NAME, blog['owner_user_id'])),
+        ('post by slug', lambda: db.get_post_by_slug(DB_NAME, blog['id'], post['slug'])),
+        ('post validators', lambda: db.get_post_validators(DB_NAME, blog['id'], post['slug'])),
+        ('index validators', lambda: db.get_index_validators(DB_NAME, blog['id'])),
+        ('approved comments', lambda: db.get_approved_comments_for_post(DB_NAME, post['id'])),
+        ('like count', lambda: db.get_like_count_for_post(DB_NAME, post['id'])),
+    ]
+
+def measure(query, iterations):
+    query() # Warm up (and prepare, when enabled)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('subdomain')
+    parser.add_argument('slug')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    blog = get_blog_by_subdomain(args.subdomain)
+    if blog is None:
+        parser.error(f"No blog with subdomain '{args.subdomain}'")
+    post = db.get_post_by_slug(DB_NAME, blog['id'], args.slug)
+    if post is None:
+        parser.error(f"No post '{args.slug}' on blog '{args.subdomain}'")
+
+    print(f"{'query':<18} {'text p50':>9} {'p95':>8} {'prepared p50':>13} {'p95':>8} {'change':>8}")
+    for name, query in hot_queries(blog, post):
+        db_utils.PREPARED_STATEMENTS = False
+        text = measure(query, args.iterations)
+        db_utils.PREPARED_STATEMENTS = True
+        prepared = measure(query, args.iterations)
+        change = (percentile(prepared, 50) / percentile(text, 50) - 1) * 100
+        print(f"{name:<18} {percentile(text, 50):8.3f}ms {percentile(text, 95):7.3f}ms "
+              f"{percentile(prepared, 50):12.3f}ms {percentile(prepared, 95):7.3f}ms {change:+7.1f}%")
+    print(db_utils.get_prepared_stats())
+
+if __name__ == '__main__':
+    main()
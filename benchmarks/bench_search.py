@@ -0,0 +1,112 @@
+"""Search latency on synthetic data: per-blog and platform-wide db.search_posts.
+
+Creates a throwaway user, blog and N generated posts (with tags), times
+random one- and two-word searches (a third of them naming a tag, so the tag
+branch of the search is measured too), then deletes everything it created.
+Needs a reachable MySQL database with the schema applied (.env). Run from the project root:
+
+    python -m benchmarks.bench_search [--posts 20000] [--queries 200] [--keep]
+"""
+import argparse
+import os
+import random
+import string
+import time
+from dotenv import load_dotenv
+from core.db_utils import execute_query, pooled_connection, bulk_insert
+from blog_instance import db
+from blog_instance.services import generate_slug_from_title
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
+BENCH_SUBDOMAIN = 'bench-search'
+BENCH_EMAIL = 'bench-search@example.invalid'
+# Every generated word starts with this, so tags named after words match the query slugs
+# and cleanup() can find the tags it created
+BENCH_WORD_PREFIX = 'benchw'
+BENCH_TAG_COUNT = 200
+INSERT_BATCH = 500
+
+def make_vocabulary(size, rng):
+    return [BENCH_WORD_PREFIX + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(size)]
+
+def cleanup():
+    user = execute_query(DB_NAME, "SELECT id FROM users WHERE email = %s", (BENCH_EMAIL,), one=True)
+    execute_query(DB_NAME, "DELETE FROM blogs WHERE subdomain_name = %s", (BENCH_SUBDOMAIN,), commit=True) # Posts cascade
+    execute_query(DB_NAME, "DELETE FROM tags WHERE slug LIKE %s", (BENCH_WORD_PREFIX + '%',), commit=True)
+    if user:
+        execute_query(DB_NAME, "DELETE FROM users WHERE id = %s", (user['id'],), commit=True)
+
+def populate(post_count, vocabulary, tag_words, rng):
+    """Inserts the benchmark user, blog, tags (one per word of `tag_words`) and posts. Returns the blog id."""
+    user_id = execute_query(DB_NAME, "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                            ('bench-search', BENCH_EMAIL, '!'), commit=True, last_row_id=True)
+    blog_id = execute_query(DB_NAME, "INSERT INTO blogs (subdomain_name, blog_title, owner_user_id, owner_email) VALUES (%s, %s, %s, %s)",
+                            (BENCH_SUBDOMAIN, 'Search benchmark', user_id, BENCH_EMAIL), commit=True, last_row_id=True)
+    tag_ids = db.get_or_create_tags(DB_NAME, [(word, generate_slug_from_title(word)) for word in tag_words])
+
+    # Zipf-like word frequencies, as in real text: a few very common words, a long tail of rare ones
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    with pooled_connection(DB_NAME) as conn:
+        for start in range(0, post_count, INSERT_BATCH):
+            rows, post_tags = [], []
+            for n in range(start, min(start + INSERT_BATCH, post_count)):
+                words = rng.choices(vocabulary, weights=weights, k=rng.randint(80, 400))
+                title = ' '.join(rng.choices(vocabulary, weights=weights, k=6)).capitalize()
+                content = '<p>' + ' '.join(words) + '</p>'
+                rows.append((blog_id, user_id, title, f"bench-{n}", content))
+            values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))
+            first_id = execute_query(conn, f"INSERT INTO posts (blog_id, user_id, title, slug, content) VALUES {values}",
+                                     tuple(v for row in rows for v in row), commit=True, last_row_id=True)
+            for post_id in range(first_id, first_id + len(rows)): # Consecutive ids with innodb_autoinc_lock_mode <= 1
+                post_tags.extend((post_id, tag_id, blog_id) for tag_id in rng.sample(tag_ids, 2))
+            bulk_insert(conn, 'post_tags', ('post_id', 'tag_id', 'blog_id'), post_tags, ignore=True)
+            print(f"  {min(start + INSERT_BATCH, post_count)}/{post_count} posts", end='\r')
+        execute_query(conn, "UPDATE blogs SET post_count = %s WHERE id = %s", (post_count, blog_id), commit=True)
+    print()
+    return blog_id
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * pct / 100), len(samples) - 1)]
+
+def run(name, queries, search):
+    timings = []
+    for query_text in queries:
+        started = time.perf_counter()
+        search(query_text)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{name:<10} p50 {percentile(timings, 50):7.2f} ms   p95 {percentile(timings, 95):7.2f} ms   max {max(timings):7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=20000, help='Distinct generated words (default 20000).')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='Leave the generated data in place.')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    # Mid-frequency words: skip the most common ones (FULLTEXT treats them like stopwords)
+    candidates = vocabulary[50:5000]
+    tag_words = rng.sample(candidates, BENCH_TAG_COUNT)
+    # One query in three starts with a tag's word, so the tag UNION branch finds posts too
+    queries = [' '.join(([rng.choice(tag_words)] if n % 3 == 0 else []) + rng.sample(candidates, rng.randint(1, 2)))
+               for n in range(args.queries)]
+    cleanup()
+    try:
+        print(f"Generating {args.posts} posts...")
+        blog_id = populate(args.posts, vocabulary, tag_words, rng)
+        tag_slug_for = lambda q: [generate_slug_from_title(word) for word in q.split()]
+        run('blog', queries, lambda q: db.search_posts(DB_NAME, q, tag_slug_for(q), 11, blog_id=blog_id))
+        run('platform', queries, lambda q: db.search_posts(DB_NAME, q, tag_slug_for(q), 11))
+    finally:
+        if not args.keep:
+            cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
-import mysql.connector
-from core.db_utils import execute_query, get_db_connection # get_db_connection might not be needed if execute_query handles it
+from core.db_utils import execute_query, execute_multi, bulk_insert
 
 # Note: All functions will now operate on the main database (db_name)
 # and use blog_id to scope data where appropriate.
@@ -14,31 +13,158 @@ def get_user_by_id(db_name, user_id): # User lookup is global
     """Retrieves a user record from the main users table by ID."""
     query = "SELECT * FROM users WHERE id = %s" # users table is global
     args = (user_id,)
-    return execute_query(db_name, query, args, one=True)
+    return execute_query(db_name, query, args, one=True, prepared=True)
 
 # For posts, tags, comments, likes, we need blog_id to scope them.
 # The 'posts' table in mysql_schema.sql already has a 'blog_id' column.
 
-def create_post(db_name, blog_id, user_id, title, slug, content):
+def create_post(db_name, blog_id, user_id, title, slug, content, excerpt, word_count, content_html, content_html_key):
     """Creates a new post for a specific blog."""
     query = """
-    INSERT INTO posts (blog_id, user_id, title, slug, content)
-    VALUES (%s, %s, %s, %s, %s)
+    INSERT INTO posts (blog_id, user_id, title, slug, content, excerpt, word_count, content_html, content_html_key)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
     """
-    args = (blog_id, user_id, title, slug, content)
+    args = (blog_id, user_id, title, slug, content, excerpt, word_count, content_html, content_html_key)
     return execute_query(db_name, query, args, commit=True, last_row_id=True)
 
-def get_all_posts(db_name, blog_id):
-    """Retrieves all posts for a specific blog."""
-    query = "SELECT * FROM posts WHERE blog_id = %s ORDER BY creation_timestamp DESC"
-    args = (blog_id,)
+# Columns shown in post listings: never the content TEXT, the stored excerpt stands in for it
+LISTING_COLUMNS = "id, title, slug, excerpt, word_count, creation_timestamp, last_modified_timestamp"
+
+def get_posts_page(db_name, blog_id, limit, before=None, after=None):
+    """Retrieves a page of a blog's posts, newest first, by keyset on (creation_timestamp, id).
+
+    Args:
+        before: A (creation_timestamp, id) key; only older posts are returned.
+        after: A (creation_timestamp, id) key; only newer posts are returned (the closest ones).
+        limit: Maximum number of posts.
+
+    Each page is one range scan of the (blog_id, creation_timestamp, id) index,
+    so its cost does not depend on how deep into the blog the page is.
+    """
+    if after is not None:
+        query = f"""
+        SELECT {LISTING_COLUMNS} FROM posts
+        WHERE blog_id = %s AND (creation_timestamp > %s OR (creation_timestamp = %s AND id > %s))
+        ORDER BY creation_timestamp ASC, id ASC
+        LIMIT %s
+        """
+        args = (blog_id, after[0], after[0], after[1], limit)
+        return list(reversed(execute_query(db_name, query, args, many=True)))
+    if before is not None:
+        query = f"""
+        SELECT {LISTING_COLUMNS} FROM posts
+        WHERE blog_id = %s AND (creation_timestamp < %s OR (creation_timestamp = %s AND id < %s))
+        ORDER BY creation_timestamp DESC, id DESC
+        LIMIT %s
+        """
+        args = (blog_id, before[0], before[0], before[1], limit)
+        return execute_query(db_name, query, args, many=True)
+    query = f"""
+    SELECT {LISTING_COLUMNS} FROM posts
+    WHERE blog_id = %s
+    ORDER BY creation_timestamp DESC, id DESC
+    LIMIT %s
+    """
+    args = (blog_id, limit)
     return execute_query(db_name, query, args, many=True)
 
 def get_post_by_slug(db_name, blog_id, slug):
     """Retrieves a single post for a specific blog by slug."""
     query = "SELECT * FROM posts WHERE blog_id = %s AND slug = %s"
     args = (blog_id, slug)
-    return execute_query(db_name, query, args, one=True)
+    return execute_query(db_name, query, args, one=True, prepared=True)
+
+def get_post_page(db_name, blog_id, slug):
+    """Loads everything a post page shows in one round trip.
+
+    Returns the post row with its 'tags' and approved 'comments' lists added,
+    or None if the blog has no post with this slug. View and like counts are
+    columns of posts, so they come with the post row.
+    """
+    query = """
+    SELECT * FROM posts WHERE blog_id = %s AND slug = %s;
+    SELECT t.name, t.slug
+    FROM posts p
+    JOIN post_tags pt ON pt.post_id = p.id
+    JOIN tags t ON t.id = pt.tag_id
+    WHERE p.blog_id = %s AND p.slug = %s;
+    SELECT c.*
+    FROM posts p
+    JOIN comments c ON c.post_id = p.id
+    WHERE p.blog_id = %s AND p.slug = %s AND c.is_approved = 1
+    ORDER BY c.submission_timestamp ASC
+    """
+    args = (blog_id, slug) * 3
+    post_rows, tags, comments = execute_multi(db_name, query, args)
+    if not post_rows:
+        return None
+    post = post_rows[0]
+    post['tags'] = tags
+    post['comments'] = comments
+    return post
+
+# Score added per matching tag, on the scale of MATCH() relevance for a good text hit
+TAG_MATCH_SCORE = 1.0
+
+def search_posts(db_name, query_text, tag_slugs, limit, offset=0, blog_id=None):
+    """Ranks published posts matching a search, from the posts FULLTEXT index and tag slugs.
+
+    Args:
+        query_text: Words searched in title/content (natural language mode: no operators).
+        tag_slugs: Tag slugs whose posts also match, each adding TAG_MATCH_SCORE.
+        blog_id: Restricts the search to one blog; None searches the whole platform.
+
+    Returns:
+        Listing columns plus subdomain_name and score, best first.
+    """
+    blog_filter = "AND blog_id = %s" if blog_id is not None else ""
+    blog_args = (blog_id,) if blog_id is not None else ()
+    matches = [f"""
+        SELECT id AS post_id, MATCH(title, content) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM posts
+        WHERE MATCH(title, content) AGAINST (%s IN NATURAL LANGUAGE MODE) {blog_filter}"""]
+    args = (query_text, query_text) + blog_args
+    if tag_slugs:
+        matches.append(f"""
+        SELECT pt.post_id, %s AS score
+        FROM tags t
+        JOIN post_tags pt ON pt.tag_id = t.id
+        WHERE t.slug IN ({', '.join(['%s'] * len(tag_slugs))})""")
+        args += (TAG_MATCH_SCORE,) + tuple(tag_slugs)
+    query = f"""
+    SELECT p.id, p.blog_id, p.title, p.slug, p.excerpt, p.creation_timestamp, b.subdomain_name,
+           SUM(m.score) AS score
+    FROM ({' UNION ALL '.join(matches)}
+    ) m
+    JOIN posts p ON p.id = m.post_id
+    JOIN blogs b ON b.id = p.blog_id
+    WHERE p.is_published = 1 {blog_filter.replace('blog_id', 'p.blog_id')}
+    GROUP BY p.id
+    ORDER BY score DESC, p.creation_timestamp DESC, p.id DESC
+    LIMIT %s OFFSET %s
+    """
+    args += blog_args + (limit, offset)
+    return execute_query(db_name, query, args, many=True)
+
+def get_post_contents(db_name, post_ids):
+    """Returns {post_id: content} for the given posts, e.g. to build search snippets for one result page."""
+    if not post_ids:
+        return {}
+    query = f"SELECT id, content FROM posts WHERE id IN ({', '.join(['%s'] * len(post_ids))})"
+    rows = execute_query(db_name, query, tuple(post_ids), many=True)
+    return {row['id']: row['content'] for row in rows}
+
+def get_feed_posts(db_name, blog_id, limit):
+    """Retrieves a blog's newest published posts with what a feed entry shows."""
+    query = """
+    SELECT id, title, slug, excerpt, content, content_html, content_html_key, creation_timestamp, last_modified_timestamp
+    FROM posts
+    WHERE blog_id = %s AND is_published = 1
+    ORDER BY creation_timestamp DESC, id DESC
+    LIMIT %s
+    """
+    args = (blog_id, limit)
+    return execute_query(db_name, query, args, many=True)
 
 def get_post_by_id(db_name, blog_id, post_id): # Added for edit/delete scenarios
     """Retrieves a single post for a specific blog by its ID."""
@@ -46,53 +172,192 @@ def get_post_by_id(db_name, blog_id, post_id): # Added for edit/delete scenarios
     args = (blog_id, post_id)
     return execute_query(db_name, query, args, one=True)
 
-def update_post(db_name, blog_id, post_id, title, slug, content):
+def update_post(db_name, blog_id, post_id, title, slug, content, excerpt, word_count, content_html, content_html_key):
     """Updates an existing post for a specific blog."""
     query = """
     UPDATE posts
-    SET title = %s, slug = %s, content = %s, last_modified_timestamp = CURRENT_TIMESTAMP
+    SET title = %s, slug = %s, content = %s, excerpt = %s, word_count = %s,
+        content_html = %s, content_html_key = %s, last_modified_timestamp = CURRENT_TIMESTAMP
     WHERE id = %s AND blog_id = %s
     """
-    args = (title, slug, content, post_id, blog_id)
+    args = (title, slug, content, excerpt, word_count, content_html, content_html_key, post_id, blog_id)
     execute_query(db_name, query, args, commit=True)
 
 def delete_post(db_name, blog_id, post_id):
-    """Deletes a post for a specific blog."""
+    """Deletes a post for a specific blog. Returns the number of posts deleted (0 or 1)."""
     # CASCADE DELETE on foreign keys in comments, likes, post_tags should handle related data
     query = "DELETE FROM posts WHERE id = %s AND blog_id = %s"
     args = (post_id, blog_id)
+    return execute_query(db_name, query, args, commit=True, rowcount=True)
+
+def touch_blog(db_name, blog_id, post_delta=0):
+    """Records a post write on the blog row: bumps content_version and last_changed, adjusts post_count.
+
+    Call it in the same transaction as the post write; the blog index and
+    sitemap validators read these columns instead of aggregating posts.
+    """
+    query = """
+    UPDATE blogs
+    SET post_count = post_count + %s, content_version = content_version + 1, last_changed = CURRENT_TIMESTAMP
+    WHERE id = %s
+    """
+    args = (post_delta, blog_id)
     execute_query(db_name, query, args, commit=True)
 
+def rebuild_blog_post_counts(db_name):
+    """Recomputes blogs.post_count and last_changed from posts. Returns the number of blogs corrected."""
+    query = """
+    UPDATE blogs b
+    LEFT JOIN (SELECT blog_id, COUNT(*) AS post_count FROM posts GROUP BY blog_id) p ON p.blog_id = b.id
+    SET b.post_count = COALESCE(p.post_count, 0), b.content_version = b.content_version + 1, b.last_changed = CURRENT_TIMESTAMP
+    WHERE b.post_count <> COALESCE(p.post_count, 0)
+    """
+    return execute_query(db_name, query, commit=True, rowcount=True)
+
 # Tags are global in the current mysql_schema.sql (name is UNIQUE).
 # If tags should be per-blog, the schema needs adjustment. Assuming global for now.
-def create_tag(db_name, name, slug):
-    """Creates a new tag (globally)."""
-    query = "INSERT IGNORE INTO tags (name, slug) VALUES (%s, %s)"
-    args = (name, slug)
+def get_or_create_tags(db_name, tags):
+    """Resolves (name, slug) pairs to tag ids, creating missing tags (globally).
+
+    Runs two statements whatever the number of tags (up to MYSQL_BULK_BATCH_SIZE):
+    one multi-row INSERT IGNORE and one SELECT. Returns the ids in input order; a
+    tag whose name already exists under another slug resolves to that existing tag.
+    """
+    if not tags:
+        return []
+    bulk_insert(db_name, 'tags', ('name', 'slug'), tags, ignore=True)
+
+    names = [name for name, _ in tags]
+    slugs = [slug for _, slug in tags]
+    query = f"""
+    SELECT id, name, slug FROM tags
+    WHERE slug IN ({', '.join(['%s'] * len(slugs))}) OR name IN ({', '.join(['%s'] * len(names))})
+    """
+    rows = execute_query(db_name, query, tuple(slugs) + tuple(names), many=True)
+    ids_by_slug = {row['slug']: row['id'] for row in rows}
+    ids_by_name = {row['name']: row['id'] for row in rows}
+    return [ids_by_slug.get(slug, ids_by_name.get(name)) for name, slug in tags]
+
+def get_tag_ids_for_post(db_name, post_id): # post_id is global
+    """Returns the ids of the tags currently attached to a post."""
+    query = "SELECT tag_id FROM post_tags WHERE post_id = %s"
+    args = (post_id,)
+    return [row['tag_id'] for row in execute_query(db_name, query, args, many=True)]
+
+def remove_post_tags(db_name, post_id, tag_ids): # post_id is global
+    """Detaches the given tags from a post in one statement."""
+    if not tag_ids:
+        return
+    query = f"DELETE FROM post_tags WHERE post_id = %s AND tag_id IN ({', '.join(['%s'] * len(tag_ids))})"
+    args = (post_id,) + tuple(tag_ids)
     execute_query(db_name, query, args, commit=True)
-    return execute_query(db_name, "SELECT id FROM tags WHERE slug = %s", (slug,), one=True)['id']
-
-def add_post_tags(db_name, post_id, tag_ids): # blog_id not strictly needed if post_id is globally unique
-    """Adds entries to the post_tags table."""
-    query = "INSERT INTO post_tags (post_id, tag_id) VALUES (%s, %s)"
-    args_list = [(post_id, tag_id) for tag_id in tag_ids]
-    # Using executemany for efficiency, execute_query might need adjustment or direct connection use
-    conn = get_db_connection(db_name)
-    cursor = None # Define cursor before try block
-    try:
-        cursor = conn.cursor()
-        cursor.executemany(query, args_list)
-        conn.commit()
-    except mysql.connector.Error as e:
-        print(f"Database error during add_post_tags: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+def add_post_tags(db_name, blog_id, post_id, tag_ids):
+    """Adds entries to the post_tags table in one multi-row INSERT.
+
+    blog_id is the post's blog, copied onto each row for the per-blog tag pages.
+    """
+    bulk_insert(db_name, 'post_tags', ('post_id', 'tag_id', 'blog_id'), [(post_id, tag_id, blog_id) for tag_id in tag_ids])
+
+def adjust_tag_usage(db_name, blog_id, tag_ids, delta):
+    """Adds `delta` (+1/-1) to the usage counts of tags on one blog (tag_usage) and globally (tags.usage_count).
+
+    Call it in the same transaction as the post_tags change it mirrors.
+    """
+    if not tag_ids:
+        return
+    bulk_insert(db_name, 'tag_usage', ('blog_id', 'tag_id', 'post_count'), [(blog_id, tag_id, delta) for tag_id in tag_ids],
+                on_duplicate_update={'post_count': 'post_count + VALUES(post_count)'})
+    placeholders = ', '.join(['%s'] * len(tag_ids))
+    query = f"UPDATE tags SET usage_count = GREATEST(usage_count + %s, 0) WHERE id IN ({placeholders})"
+    execute_query(db_name, query, (delta,) + tuple(tag_ids), commit=True)
+    if delta < 0:
+        query = f"DELETE FROM tag_usage WHERE blog_id = %s AND tag_id IN ({placeholders}) AND post_count <= 0"
+        execute_query(db_name, query, (blog_id,) + tuple(tag_ids), commit=True)
+
+def get_tag_by_slug(db_name, slug):
+    """Retrieves a tag with its global usage count."""
+    query = "SELECT id, name, slug, usage_count FROM tags WHERE slug = %s"
+    args = (slug,)
+    return execute_query(db_name, query, args, one=True, prepared=True)
+
+def get_blog_tag_usage(db_name, blog_id, tag_id):
+    """Returns how many posts of a blog carry a tag (from tag_usage)."""
+    query = "SELECT post_count FROM tag_usage WHERE blog_id = %s AND tag_id = %s"
+    args = (blog_id, tag_id)
+    result = execute_query(db_name, query, args, one=True)
+    return result['post_count'] if result else 0
+
+def get_tag_cloud(db_name, limit, blog_id=None):
+    """Returns the most used tags with their post counts, of one blog or of the whole platform."""
+    if blog_id is not None:
+        query = """
+        SELECT t.id, t.name, t.slug, u.post_count
+        FROM tag_usage u
+        JOIN tags t ON t.id = u.tag_id
+        WHERE u.blog_id = %s AND u.post_count > 0
+        ORDER BY u.post_count DESC, t.name
+        LIMIT %s
+        """
+        args = (blog_id, limit)
+    else:
+        query = """
+        SELECT id, name, slug, usage_count AS post_count
+        FROM tags
+        WHERE usage_count > 0
+        ORDER BY usage_count DESC, name
+        LIMIT %s
+        """
+        args = (limit,)
+    return execute_query(db_name, query, args, many=True)
+
+def get_tag_posts(db_name, tag_id, limit, before_post_id=None, blog_id=None):
+    """Retrieves a page of posts carrying a tag, newest (highest id) first.
+
+    Args:
+        before_post_id: Keyset cursor; only posts with lower ids are returned.
+        blog_id: Restricts the list to one blog; None lists posts of every blog.
+
+    Per-blog pages seek the (blog_id, tag_id, post_id) index, platform pages
+    the (tag_id, post_id) one, so neither reads rows outside the page.
+    """
+    if blog_id is not None:
+        where, args = "pt.blog_id = %s AND pt.tag_id = %s", (blog_id, tag_id)
+    else:
+        where, args = "pt.tag_id = %s", (tag_id,)
+    if before_post_id is not None:
+        where += " AND pt.post_id < %s"
+        args += (before_post_id,)
+    query = f"""
+    SELECT p.id, p.title, p.slug, p.excerpt, p.word_count, p.creation_timestamp, p.last_modified_timestamp,
+           b.subdomain_name
+    FROM post_tags pt
+    JOIN posts p ON p.id = pt.post_id
+    JOIN blogs b ON b.id = p.blog_id
+    WHERE {where} AND p.is_published = 1
+    ORDER BY pt.post_id DESC
+    LIMIT %s
+    """
+    args += (limit,)
+    return execute_query(db_name, query, args, many=True)
+
+def rebuild_tag_usage(db_name):
+    """Recomputes tag_usage and tags.usage_count from post_tags. Returns the number of (blog, tag) rows."""
+    execute_query(db_name, "DELETE FROM tag_usage", commit=True)
+    query = """
+    INSERT INTO tag_usage (blog_id, tag_id, post_count)
+    SELECT blog_id, tag_id, COUNT(*)
+    FROM post_tags
+    GROUP BY blog_id, tag_id
+    """
+    rows = execute_query(db_name, query, commit=True, rowcount=True)
+    query = """
+    UPDATE tags t
+    LEFT JOIN (SELECT tag_id, SUM(post_count) AS post_count FROM tag_usage GROUP BY tag_id) u ON u.tag_id = t.id
+    SET t.usage_count = COALESCE(u.post_count, 0)
+    """
+    execute_query(db_name, query, commit=True)
+    return rows
 
 def get_tags_for_post(db_name, post_id): # blog_id not strictly needed if post_id is globally unique
     """Retrieves tags associated with a post."""
@@ -124,7 +389,7 @@ def get_approved_comments_for_post(db_name, post_id): # post_id is global
     """Retrieves approved comments for a post."""
     query = "SELECT * FROM comments WHERE post_id = %s AND is_approved = 1 ORDER BY submission_timestamp ASC"
     args = (post_id,)
-    return execute_query(db_name, query, args, many=True)
+    return execute_query(db_name, query, args, many=True, prepared=True)
 
 def get_pending_comments(db_name, blog_id):
     """Retrieves all pending comments for a specific blog for the admin dashboard."""
@@ -153,35 +418,235 @@ def delete_comment(db_name, comment_id): # comment_id is global
     execute_query(db_name, query, args, commit=True)
 
 def add_like(db_name, post_id, liker_identifier): # post_id is global
-    """Adds a like to a post."""
+    """Adds a like to a post. Returns True if it was new, False if this liker had already liked the post."""
     query = "INSERT IGNORE INTO likes (post_id, liker_identifier) VALUES (%s, %s)"
     args = (post_id, liker_identifier)
+    return execute_query(db_name, query, args, commit=True, rowcount=True) == 1
+
+def increment_post_like_count(db_name, post_id): # post_id is global
+    """Increments the denormalized like counter of a post. Call it in the same transaction as add_like."""
+    # Keep last_modified_timestamp: a like is not an edit (the column has ON UPDATE CURRENT_TIMESTAMP)
+    query = "UPDATE posts SET like_count = like_count + 1, last_modified_timestamp = last_modified_timestamp WHERE id = %s"
+    args = (post_id,)
     execute_query(db_name, query, args, commit=True)
 
 def get_like_count_for_post(db_name, post_id): # post_id is global
-    """Gets the number of likes for a post."""
-    query = "SELECT COUNT(*) FROM likes WHERE post_id = %s"
+    """Gets the number of likes for a post (from posts.like_count, see reconcile_like_counts)."""
+    query = "SELECT like_count FROM posts WHERE id = %s"
     args = (post_id,)
-    result = execute_query(db_name, query, args, one=True)
-    return result['COUNT(*)'] if result else 0 # MySQL COUNT(*) returns as a key
+    result = execute_query(db_name, query, args, one=True, prepared=True)
+    return result['like_count'] if result else 0
+
+def get_post_id_range(db_name):
+    """Returns the lowest and highest post ids, used to walk the posts table in batches."""
+    query = "SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM posts"
+    return execute_query(db_name, query, one=True)
+
+def iter_posts(db_name, batch_size):
+    """Streams id, content and content_html_key of every post in id order (for backfills), batch_size rows per fetch."""
+    query = "SELECT id, content, content_html_key FROM posts ORDER BY id"
+    return execute_query(db_name, query, stream=True, batch_size=batch_size)
+
+def set_post_excerpts(db_name, rows):
+    """Stores (excerpt, word_count, post_id) rows in one multi-row UPDATE, without touching last_modified_timestamp.
+
+    Callers pass one batch at a time (backfill-excerpts sends --batch-size posts in id order).
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    cases = ' '.join(['WHEN %s THEN %s'] * len(rows))
+    placeholders = ', '.join(['%s'] * len(rows))
+    query = f"""
+    UPDATE posts
+    SET excerpt = CASE id {cases} END, word_count = CASE id {cases} END,
+        last_modified_timestamp = last_modified_timestamp
+    WHERE id IN ({placeholders})
+    """
+    args = (tuple(value for excerpt, _, post_id in rows for value in (post_id, excerpt))
+            + tuple(value for _, word_count, post_id in rows for value in (post_id, word_count))
+            + tuple(post_id for _, _, post_id in rows))
+    execute_query(db_name, query, args, commit=True)
+
+def set_post_html(db_name, post_id, content_html, content_html_key): # post_id is global
+    """Stores a post's rendered HTML and its render key without touching last_modified_timestamp."""
+    query = """
+    UPDATE posts SET content_html = %s, content_html_key = %s, last_modified_timestamp = last_modified_timestamp
+    WHERE id = %s
+    """
+    args = (content_html, content_html_key, post_id)
+    execute_query(db_name, query, args, commit=True)
+
+def reconcile_like_counts(db_name, first_id, last_id):
+    """Recomputes posts.like_count from the likes table for posts with ids in [first_id, last_id].
+
+    Returns the number of posts whose counter had drifted and was corrected.
+    """
+    query = """
+    UPDATE posts p
+    LEFT JOIN (
+        SELECT post_id, COUNT(*) AS like_count
+        FROM likes
+        WHERE post_id BETWEEN %s AND %s
+        GROUP BY post_id
+    ) l ON l.post_id = p.id
+    SET p.like_count = COALESCE(l.like_count, 0), p.last_modified_timestamp = p.last_modified_timestamp
+    WHERE p.id BETWEEN %s AND %s AND p.like_count <> COALESCE(l.like_count, 0)
+    """
+    args = (first_id, last_id, first_id, last_id)
+    return execute_query(db_name, query, args, commit=True, rowcount=True)
 
 def increment_post_view_count(db_name, post_id): # post_id is global
     """Increments the view count for a post."""
-    query = "UPDATE posts SET view_count = view_count + 1 WHERE id = %s"
+    query = "UPDATE posts SET view_count = view_count + 1, last_modified_timestamp = last_modified_timestamp WHERE id = %s"
     args = (post_id,)
     execute_query(db_name, query, args, commit=True)
 
-def get_posts_with_stats(db_name, blog_id):
-    """Retrieves posts for a specific blog with their view and like counts for the admin dashboard."""
+def get_post_validators(db_name, blog_id, slug):
+    """Cheap HTTP validators for a post page: its timestamp plus approved comment and like counts."""
     query = """
-    SELECT p.*,
-           (SELECT COUNT(*) FROM likes l WHERE l.post_id = p.id) AS like_count,
-           (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id AND c.is_approved = 0) AS pending_comment_count
+    SELECT p.id, p.last_modified_timestamp,
+           (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id AND c.is_approved = 1) AS approved_comment_count,
+           p.like_count
     FROM posts p
-    WHERE p.blog_id = %s
-    ORDER BY p.creation_timestamp DESC
+    WHERE p.blog_id = %s AND p.slug = %s
+    """
+    args = (blog_id, slug)
+    return execute_query(db_name, query, args, one=True, prepared=True)
+
+def get_index_validators(db_name, blog_id):
+    """Cheap HTTP validators for a blog index: the blog's stored post count, content version and last change."""
+    query = """
+    SELECT post_count, content_version, last_changed AS last_modified
+    FROM blogs
+    WHERE id = %s
     """
     args = (blog_id,)
+    return execute_query(db_name, query, args, one=True, prepared=True)
+
+def get_post_page_location(db_name, post_id): # post_id is global
+    """Returns the slug and blog subdomain of a post, used to invalidate its cached page."""
+    query = """
+    SELECT p.slug, b.subdomain_name
+    FROM posts p
+    JOIN blogs b ON b.id = p.blog_id
+    WHERE p.id = %s
+    """
+    args = (post_id,)
+    return execute_query(db_name, query, args, one=True)
+
+def get_comment_page_location(db_name, comment_id): # comment_id is global
+    """Returns the slug and blog subdomain of the post a comment belongs to."""
+    query = """
+    SELECT p.slug, b.subdomain_name
+    FROM comments c
+    JOIN posts p ON p.id = c.post_id
+    JOIN blogs b ON b.id = p.blog_id
+    WHERE c.id = %s
+    """
+    args = (comment_id,)
+    return execute_query(db_name, query, args, one=True)
+
+def add_post_view_counts(db_name, counts): # post_id is global
+    """Adds buffered view counts ({post_id: views}) to posts in one multi-row UPDATE."""
+    if not counts:
+        return
+    post_ids = list(counts)
+    cases = ' '.join(['WHEN %s THEN %s'] * len(post_ids))
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    # Keep last_modified_timestamp: views are not edits (the column has ON UPDATE CURRENT_TIMESTAMP)
+    query = f"""
+    UPDATE posts
+    SET view_count = view_count + CASE id {cases} ELSE 0 END, last_modified_timestamp = last_modified_timestamp
+    WHERE id IN ({placeholders})
+    """
+    args = tuple(value for post_id in post_ids for value in (post_id, counts[post_id])) + tuple(post_ids)
+    execute_query(db_name, query, args, commit=True)
+
+def get_posts_with_stats(db_name, blog_id, limit, offset=0):
+    """Retrieves one page of a blog's posts with view, like and pending comment counts for the admin dashboard.
+
+    Post bodies are not selected. The page of post ids is picked first (from the
+    (blog_id, creation_timestamp) index), then pending comments are counted for
+    those posts only, in one grouped LEFT JOIN.
+    """
+    query = """
+    SELECT p.id, p.title, p.slug, p.creation_timestamp, p.last_modified_timestamp, p.is_published,
+           p.view_count, p.like_count,
+           COUNT(c.id) AS pending_comment_count
+    FROM (
+        SELECT id FROM posts
+        WHERE blog_id = %s
+        ORDER BY creation_timestamp DESC, id DESC
+        LIMIT %s OFFSET %s
+    ) page
+    JOIN posts p ON p.id = page.id
+    LEFT JOIN comments c ON c.post_id = p.id AND c.is_approved = 0
+    GROUP BY p.id
+    ORDER BY p.creation_timestamp DESC, p.id DESC
+    """
+    args = (blog_id, limit, offset)
+    return execute_query(db_name, query, args, many=True)
+
+def get_sitemap_validators(db_name, blog_id):
+    """Post count, content version and last change of a blog, for sitemap sharding and validators.
+
+    post_count counts every post: nothing unpublishes posts today. If that
+    changes, the last shard may come out short but stays valid.
+    """
+    query = """
+    SELECT post_count, content_version, last_changed AS last_modified
+    FROM blogs
+    WHERE id = %s
+    """
+    args = (blog_id,)
+    return execute_query(db_name, query, args, one=True, prepared=True)
+
+def get_sitemap_shard_start(db_name, blog_id, offset):
+    """Returns the (creation_timestamp, id) key of a blog's `offset`-th published post (0-based, oldest first), or None.
+
+    Used to find where a sitemap shard starts; the scan only walks the
+    (blog_id, creation_timestamp, id) index, without building a result set.
+    """
+    query = """
+    SELECT creation_timestamp, id FROM posts
+    WHERE blog_id = %s AND is_published = 1
+    ORDER BY creation_timestamp ASC, id ASC
+    LIMIT 1 OFFSET %s
+    """
+    args = (blog_id, offset)
+    row = execute_query(db_name, query, args, one=True)
+    return (row['creation_timestamp'], row['id']) if row else None
+
+def get_sitemap_posts(db_name, blog_id, limit, after=None):
+    """Retrieves the next `limit` published posts of a blog, oldest first, by keyset on (creation_timestamp, id).
+
+    Args:
+        after: A (creation_timestamp, id) key; only later posts are returned.
+    """
+    if after is not None:
+        query = """
+        SELECT id, slug, creation_timestamp, last_modified_timestamp FROM posts
+        WHERE blog_id = %s AND is_published = 1 AND (creation_timestamp > %s OR (creation_timestamp = %s AND id > %s))
+        ORDER BY creation_timestamp ASC, id ASC
+        LIMIT %s
+        """
+        args = (blog_id, after[0], after[0], after[1], limit)
+    else:
+        query = """
+        SELECT id, slug, creation_timestamp, last_modified_timestamp FROM posts
+        WHERE blog_id = %s AND is_published = 1
+        ORDER BY creation_timestamp ASC, id ASC
+        LIMIT %s
+        """
+        args = (blog_id, limit)
     return execute_query(db_name, query, args, many=True)
 
+def count_posts(db_name, blog_id):
+    """Returns the number of posts of a blog (the count stored on the blog row)."""
+    query = "SELECT post_count FROM blogs WHERE id = %s"
+    args = (blog_id,)
+    result = execute_query(db_name, query, args, one=True)
+    return result['post_count'] if result else 0
+
 # Add other instance database interaction functions as needed
@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, session, jsonify, make_response
 from .forms import PostForm, CommentForm, LoginForm
 from . import services # Import the services module
 from . import db
+from .view_counts import view_counts
 from models import User # Import User from models.py
+from core.response_cache import page_cache
+from core.http_utils import compute_etag, not_modified_response, set_validators
+from core.html_utils import RENDERER_VERSION
+from core.feeds import feed_response
+from core.sitemaps import sitemap_cache, sitemap_etag, sitemap_response, shard_count, urlset
 import mysql # For mysql.connector.errors.IntegrityError
 from flask_login import login_user # Import login_user
 
@@ -22,7 +28,13 @@ blog_bp = Blueprint('blog', __name__)
 #     return None
 
 
+def _count_cached_view(meta):
+    """Counts a post view when post_detail is served from the page cache."""
+    if meta.get('post_id'):
+        view_counts.add(meta['post_id'])
+
 @blog_bp.route('/')
+@page_cache.cached(query_args=('before', 'after'))
 def index(blog_subdomain_part): # Added blog_subdomain_part
     print(f"[CRITICAL DEBUG] blog_bp.index called! subdomain_part: {blog_subdomain_part}")
     """Blog instance homepage - displays a list of posts."""
@@ -37,29 +49,54 @@ def index(blog_subdomain_part): # Added blog_subdomain_part
     if current_user.is_authenticated:
         return redirect(url_for('blog.admin_dashboard', blog_subdomain_part=g.subdomain))
 
-    # Fetch posts from the main database, scoped by blog_id
-    posts = db.get_all_posts(g.db_name, g.blog_id)
+    # Conditional GET: answer revalidations with 304 before loading posts or rendering
+    validators = db.get_index_validators(g.db_name, g.blog_id)
+    etag = compute_etag('index', g.blog_id, validators['post_count'], validators['content_version'])
+    last_modified = validators['last_modified']
+    not_modified = not_modified_response(etag, last_modified, public=True)
+    if not_modified is not None:
+        return not_modified
+
+    # Fetch one page of posts from the main database, scoped by blog_id (?before=/?after= cursors)
+    listing = services.get_index_page(g.db_name, g.blog_id, request.args.get('before'), request.args.get('after'),
+                                      current_app.config['BLOG_POSTS_PER_PAGE'])
 
-    return render_template('blog/index.html', posts=posts, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
+    response = make_response(render_template('blog/index.html', posts=listing['posts'], older=listing['older'], newer=listing['newer'], subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', [])))
+    return set_validators(response, etag, last_modified, public=True)
 
 @blog_bp.route('/posts/<slug>', methods=['GET', 'POST'])
+@page_cache.cached(on_hit=_count_cached_view)
 def post_detail(blog_subdomain_part, slug): # Added blog_subdomain_part
     """Displays a single post and handles comment submission."""
     # subdomain parameter is now passed by Flask
     if not g.is_blog_instance or not g.blog_id: # Check g.blog_id
         return redirect(url_for('platform.index'))
 
-    # Fetch post from the main database, scoped by blog_id
-    post = services.get_post_by_slug(g.db_name, g.blog_id, slug) # Use service layer
+    # Conditional GET: answer revalidations with 304 before loading the post or rendering.
+    # ETag only: likes and comment approvals change the page but not posts.last_modified_timestamp,
+    # so a Last-Modified header would let If-Modified-Since revalidations get stale 304s.
+    etag = None
+    if request.method == 'GET':
+        validators = db.get_post_validators(g.db_name, g.blog_id, slug)
+        if validators is None:
+            return "Post not found", 404 # Placeholder
+        etag = compute_etag('post', validators['id'], validators['last_modified_timestamp'],
+                            validators['approved_comment_count'], validators['like_count'], RENDERER_VERSION)
+        not_modified = not_modified_response(etag) # Private: the page embeds a CSRF token
+        if not_modified is not None:
+            view_counts.add(validators['id']) # A revalidated view is still a view
+            return not_modified
+
+    # Fetch post with its tags and approved comments in one round trip, scoped by blog_id
+    post = services.get_post_page(g.db_name, g.blog_id, slug) # Use service layer
 
     if post is None:
         # TODO: Render a 404 page
         return "Post not found", 404 # Placeholder
 
-    # view count is incremented within get_post_by_slug service if post found
-
-    # Fetch approved comments for the post
-    comments = db.get_approved_comments_for_post(g.db_name, post['id'])
+    # view count is incremented within get_post_page service if post found
+    page_cache.set_meta(post_id=post['id']) # Lets cache hits keep counting views
+    comments = post['comments']
 
     # Initialize comment form
     comment_form = CommentForm()
@@ -81,15 +118,77 @@ def post_detail(blog_subdomain_part, slug): # Added blog_subdomain_part
         except Exception as e:
             flash(f'Error submitting comment: {e}', 'danger')
 
-    # Pass like count to the template
-    if post: # Ensure post is not None before trying to make it a dict
-        post = dict(post) # Convert Row object to dict to add new keys
-        post['like_count'] = db.get_like_count_for_post(g.db_name, post['id'])
-        # Pass tags to the template
-        post['tags'] = db.get_tags_for_post(g.db_name, post['id'])
+    # like_count is a column of posts (kept up to date by services.add_like); tags come with the post
+
+    response = make_response(render_template('blog/post_detail.html', post=post, comments=comments, comment_form=comment_form, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', [])))
+    if etag:
+        set_validators(response, etag)
+    return response
+
+@blog_bp.route('/tags')
+@page_cache.cached()
+def tag_cloud(blog_subdomain_part):
+    """Tag cloud of this blog, from the maintained tag_usage counts."""
+    if not g.is_blog_instance or not g.blog_id:
+        return redirect(url_for('platform.index'))
+
+    tags = services.get_tag_cloud(g.db_name, blog_id=g.blog_id)
+    return render_template('blog/tags.html', tags=tags, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
+
+@blog_bp.route('/tags/<tag_slug>')
+@page_cache.cached(query_args=('before',))
+def tag_posts(blog_subdomain_part, tag_slug):
+    """Posts of this blog carrying a tag, newest first (?before=<post id> for older pages)."""
+    if not g.is_blog_instance or not g.blog_id:
+        return redirect(url_for('platform.index'))
+
+    tag_page = services.get_tag_page(g.db_name, tag_slug, request.args.get('before'),
+                                     current_app.config['BLOG_POSTS_PER_PAGE'], blog_id=g.blog_id)
+    if tag_page is None or not tag_page['post_count']:
+        return "Tag not found", 404 # Placeholder, like post_detail
+    return render_template('blog/tag.html', tag_page=tag_page, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
+
+@blog_bp.route('/search')
+def search(blog_subdomain_part):
+    """Searches this blog's posts (?q=words&page=N)."""
+    if not g.is_blog_instance or not g.blog_id:
+        return redirect(url_for('platform.index'))
 
+    search_results = services.search_posts(g.db_name, request.args.get('q', ''), request.args.get('page', 1, type=int),
+                                           current_app.config['SEARCH_RESULTS_PER_PAGE'], blog_id=g.blog_id)
+    return render_template('blog/search.html', search=search_results, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
+
+@blog_bp.route('/feed.xml')
+def feed(blog_subdomain_part):
+    """Atom feed of this blog's newest posts, cached until the next post write."""
+    if not g.is_blog_instance or not g.blog_id:
+        return redirect(url_for('platform.index'))
+
+    feed_data = services.get_blog_feed(
+        g.db_name, g.blog_id, g.subdomain,
+        url_for('blog.index', blog_subdomain_part=g.subdomain, _external=True),
+        url_for('blog.feed', blog_subdomain_part=g.subdomain, _external=True),
+        lambda slug: url_for('blog.post_detail', blog_subdomain_part=g.subdomain, slug=slug, _external=True))
+    return feed_response(feed_data)
+
+@blog_bp.route('/sitemap.xml', defaults={'shard': 1})
+@blog_bp.route('/sitemap-<int:shard>.xml')
+def sitemap(blog_subdomain_part, shard):
+    """Streams one sitemap shard of this blog (posts oldest first; shard 1 also lists the homepage and tags)."""
+    if not g.is_blog_instance or not g.blog_id:
+        return redirect(url_for('platform.index'))
 
-    return render_template('blog/post_detail.html', post=post, comments=comments, comment_form=comment_form, subdomain=g.subdomain, random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
+    validators = db.get_sitemap_validators(g.db_name, g.blog_id)
+    if shard < 1 or shard > shard_count(validators['post_count']):
+        return "Sitemap not found", 404
+    db_name, blog_id, subdomain = g.db_name, g.blog_id, g.subdomain
+    extra_urls = [(url_for('blog.index', blog_subdomain_part=subdomain, _external=True), validators['last_modified']),
+                  (url_for('blog.tag_cloud', blog_subdomain_part=subdomain, _external=True), None)]
+    post_url = lambda slug: url_for('blog.post_detail', blog_subdomain_part=subdomain, slug=slug, _external=True)
+    generate = lambda: urlset(services.iter_sitemap_urls(db_name, blog_id, shard, extra_urls, post_url))
+    return sitemap_response(lambda: sitemap_cache.stream(subdomain, f"shard-{shard}", generate),
+                            sitemap_etag(subdomain, shard, validators['post_count'], validators['content_version']),
+                            validators['last_modified'])
 
 # Route for handling likes (AJAX endpoint)
 @blog_bp.route('/posts/<int:post_id>/like', methods=['POST'])
@@ -105,7 +204,9 @@ def add_like_route(blog_subdomain_part, post_id): # Added blog_subdomain_part
     liker_identifier = request.remote_addr # Basic identifier
 
     try:
-        services.add_like(g.db_name, post_id, liker_identifier) # Use service layer
+        if not services.add_like(g.db_name, post_id, liker_identifier): # Use service layer
+            # INSERT IGNORE skipped the row: the UNIQUE (post_id, liker_identifier) constraint matched
+            return jsonify(success=False, message="Already liked this post"), 409 # Conflict
         # Get updated like count
         like_count = db.get_like_count_for_post(g.db_name, post_id)
         return jsonify(success=True, like_count=like_count)
@@ -129,11 +230,15 @@ def admin_dashboard(blog_subdomain_part): # Added blog_subdomain_part
 
     # Fetch data for the dashboard
     pending_comments = services.get_pending_comments(g.db_name, g.blog_id) # Use service
-    posts_with_stats = services.get_posts_with_stats(g.db_name, g.blog_id) # Use service
+    page = request.args.get('page', 1, type=int)
+    per_page = current_app.config['DASHBOARD_POSTS_PER_PAGE']
+    posts_with_stats, total_posts = services.get_posts_with_stats(g.db_name, g.blog_id, page, per_page) # Use service
 
     return render_template('blog/admin_dashboard.html',
                            pending_comments=pending_comments,
                            posts_with_stats=posts_with_stats,
+                           page=max(page, 1),
+                           total_pages=max((total_posts + per_page - 1) // per_page, 1),
                            subdomain=g.subdomain,
                            random_posts=g.get('random_posts', []), random_blogs_list=g.get('random_blogs_list', []))
 
@@ -1,14 +1,20 @@
 import mysql.connector
 import re
 import os
+import math
 from datetime import datetime
 from werkzeug.security import check_password_hash
 # from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user # Import when implementing login
 from flask import current_app # Import current_app to access config
 from . import db # Import local db module
+from .view_counts import view_counts
 from core.mail_utils import send_email
-from platform_management.db import add_post_to_shared_index # Import from platform management db
-from core.db_utils import execute_query # Import execute_query from core
+from core.html_utils import render_post_html, content_render_key, html_to_text, highlight_snippet
+from platform_management.db import add_post_to_shared_index, invalidate_shared_post_samples, get_blog_by_subdomain # Import from platform management db
+from core.db_utils import execute_query, transaction, pooled_connection # Import execute_query from core
+from core.response_cache import page_cache
+from core.sitemaps import sitemap_cache, invalidate_blog_sitemaps, SITEMAP_SHARD_SIZE, SITEMAP_CHUNK_SIZE
+from core.feeds import feed_cache, blog_feed_key, invalidate_blog_feed, invalidate_platform_feed, atom_entry, atom_feed, cached_entry, tag_uri
 from config import Config # Import Config
 
 # Placeholder for Flask-Login setup (will be done in app.py)
@@ -46,57 +52,303 @@ def create_post(db_name, blog_id, user_id, title, content, tags_string, subdomai
     """Creates a new post, generates slug, and adds to shared index."""
     slug = generate_slug_from_title(title)
 
-    # Create post in the main DB, scoped by blog_id
-    post_id = db.create_post(db_name, blog_id, user_id, title, slug, content)
+    # Post, tags and shared index entry are written as one unit: all or nothing
+    with transaction(db_name):
+        # Create post in the main DB, scoped by blog_id
+        excerpt, word_count = summarize_content(content)
+        post_id = db.create_post(db_name, blog_id, user_id, title, slug, content, excerpt, word_count,
+                                 render_post_html(content), content_render_key(content))
 
-    if post_id:
-        tag_names = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-        tag_ids = []
-        for tag_name in tag_names:
-            tag_slug = generate_slug_from_title(tag_name)
-            tag_id = db.create_tag(db_name, tag_name, tag_slug) # Tags are global
-            tag_ids.append(tag_id)
+        if post_id:
+            db.touch_blog(db_name, blog_id, 1) # Index/sitemap validators and post count
+            tag_ids = _unique_tag_ids(db.get_or_create_tags(db_name, parse_tags(tags_string))) # Tags are global
+            if tag_ids:
+                db.add_post_tags(db_name, blog_id, post_id, tag_ids)
+                db.adjust_tag_usage(db_name, blog_id, tag_ids, 1)
 
-        if tag_ids:
-            db.add_post_tags(db_name, post_id, tag_ids)
-
-        # Add post to main database shared index
-        post_link = f"http://{subdomain}.{base_domain_config.split(':')[0]}/posts/{slug}" # Use base_domain_config
-        # add_post_to_shared_index is defined in platform_management.db and uses MAIN_DB_NAME internally
-        add_post_to_shared_index(post_id, subdomain, title, datetime.now(), post_link)
+            # Add post to main database shared index
+            post_link = f"http://{subdomain}.{base_domain_config.split(':')[0]}/posts/{slug}" # Use base_domain_config
+            # add_post_to_shared_index is defined in platform_management.db and uses MAIN_DB_NAME internally
+            add_post_to_shared_index(post_id, subdomain, title, datetime.now(), post_link)
 
+    # Only once committed, so no concurrent reload can cache the state without the post
+    invalidate_shared_post_samples()
+    invalidate_platform_feed()
+    _invalidate_blog_pages(subdomain) # The blog index now lists the new post
+    invalidate_blog_feed(blog_id)
     return post_id
 
+EXCERPT_LENGTH = 200 # Characters, must fit posts.excerpt
+
+def summarize_content(content):
+    """Returns the (excerpt, word_count) stored alongside a post's content.
+
+    The excerpt is plain text: tags stripped, entities decoded, whitespace
+    collapsed and cut at a word boundary to EXCERPT_LENGTH characters.
+    """
+    text = html_to_text(content)
+    words = text.split()
+    if len(text) > EXCERPT_LENGTH:
+        text = text[:EXCERPT_LENGTH - 3].rsplit(' ', 1)[0] + '...'
+    return text, len(words)
+
+def encode_post_cursor(post):
+    """Builds the URL cursor of a listed post, e.g. '20240101093000-42' (creation time, id)."""
+    return f"{post['creation_timestamp']:%Y%m%d%H%M%S}-{post['id']}"
+
+def decode_post_cursor(cursor):
+    """Parses a URL cursor back into a (creation_timestamp, id) key. Returns None if it is malformed."""
+    try:
+        timestamp, post_id = cursor.split('-')
+        return datetime.strptime(timestamp, '%Y%m%d%H%M%S'), int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+def get_index_page(db_name, blog_id, before=None, after=None, per_page=None):
+    """Retrieves one page of the blog index.
+
+    Args:
+        before: Cursor of the last post of the newer page ("older" link).
+        after: Cursor of the first post of the older page ("newer" link).
+
+    Returns:
+        A dict with 'posts' and the 'older'/'newer' cursors (None when there is no such page).
+    """
+    per_page = per_page or Config.BLOG_POSTS_PER_PAGE
+    before_key, after_key = decode_post_cursor(before), decode_post_cursor(after)
+
+    # One extra row tells whether another page exists in the direction we are moving
+    if after_key is not None:
+        posts = db.get_posts_page(db_name, blog_id, per_page + 1, after=after_key)
+        has_newer, has_older = len(posts) > per_page, True
+        posts = posts[-per_page:]
+        if not posts: # Everything newer was deleted: show the first page
+            return get_index_page(db_name, blog_id, per_page=per_page)
+    else:
+        posts = db.get_posts_page(db_name, blog_id, per_page + 1, before=before_key)
+        has_older, has_newer = len(posts) > per_page, before_key is not None
+        posts = posts[:per_page]
+
+    return {
+        'posts': posts,
+        'older': encode_post_cursor(posts[-1]) if posts and has_older else None,
+        'newer': encode_post_cursor(posts[0]) if posts and has_newer else None,
+    }
+
+SEARCH_MAX_QUERY_LENGTH = 200 # Characters kept from the search box
+
+def search_posts(db_name, query_text, page=1, per_page=None, blog_id=None):
+    """Searches published posts of one blog (blog_id) or of the whole platform.
+
+    Returns:
+        A dict with the ranked 'results' of the page (each with a highlighted
+        'snippet'), the cleaned 'query', 'page' and 'has_next'.
+    """
+    per_page = per_page or Config.SEARCH_RESULTS_PER_PAGE
+    page = max(page, 1)
+    query_text = ' '.join((query_text or '').split())[:SEARCH_MAX_QUERY_LENGTH]
+    terms = list(dict.fromkeys(re.findall(r'\w+', query_text.lower())))
+    if not terms:
+        return {'query': query_text, 'results': [], 'page': page, 'has_next': False}
+
+    # A tag matches if it is one of the words, or the whole query ("machine learning" -> machine-learning)
+    tag_slugs = list(dict.fromkeys(slug for slug in [generate_slug_from_title(t) for t in terms + [query_text]] if slug))
+    # One extra row tells whether there is a next page, without counting every match
+    results = db.search_posts(db_name, query_text, tag_slugs, per_page + 1, (page - 1) * per_page, blog_id=blog_id)
+    has_next = len(results) > per_page
+    results = results[:per_page]
+
+    contents = db.get_post_contents(db_name, [result['id'] for result in results])
+    for result in results:
+        result['snippet'] = highlight_snippet(html_to_text(contents.get(result['id'], '')), terms)
+    return {'query': query_text, 'results': results, 'page': page, 'has_next': has_next}
+
+TAG_CLOUD_SIZE = 50 # Tags shown in a cloud
+TAG_CLOUD_WEIGHTS = 5 # Font size steps in a cloud
+
+def get_tag_cloud(db_name, blog_id=None, limit=TAG_CLOUD_SIZE):
+    """Returns the most used tags of a blog (or the platform), alphabetically, each with a 1..TAG_CLOUD_WEIGHTS 'weight'."""
+    tags = db.get_tag_cloud(db_name, limit, blog_id=blog_id)
+    if not tags:
+        return []
+    # Log scale, so one very popular tag doesn't flatten all the others to the smallest size
+    low, high = math.log(min(t['post_count'] for t in tags)), math.log(max(t['post_count'] for t in tags))
+    for tag in tags:
+        scale = (math.log(tag['post_count']) - low) / (high - low) if high > low else 0.5
+        tag['weight'] = 1 + round(scale * (TAG_CLOUD_WEIGHTS - 1))
+    return sorted(tags, key=lambda t: t['name'].lower())
+
+def get_tag_page(db_name, tag_slug, before=None, per_page=None, blog_id=None):
+    """Retrieves a tag and one page of its posts (of one blog, or of every blog).
+
+    Args:
+        before: Post id cursor from the previous page's 'older' link.
+
+    Returns:
+        A dict with 'tag', 'post_count', 'posts' and the 'older' cursor, or None if the tag does not exist.
+    """
+    tag = db.get_tag_by_slug(db_name, tag_slug)
+    if tag is None:
+        return None
+    per_page = per_page or Config.BLOG_POSTS_PER_PAGE
+    try:
+        before = int(before) if before is not None else None
+    except ValueError:
+        before = None # Malformed cursor: first page
+    posts = db.get_tag_posts(db_name, tag['id'], per_page + 1, before_post_id=before, blog_id=blog_id)
+    has_older = len(posts) > per_page
+    posts = posts[:per_page]
+    post_count = db.get_blog_tag_usage(db_name, blog_id, tag['id']) if blog_id is not None else tag['usage_count']
+    return {
+        'tag': tag,
+        'post_count': post_count,
+        'posts': posts,
+        'older': posts[-1]['id'] if posts and has_older else None,
+        'is_first_page': before is None,
+    }
+
+FEED_SIZE = 20 # Newest posts in a feed
+
+def get_blog_feed(db_name, blog_id, subdomain, site_url, feed_url, post_url):
+    """Returns a blog's Atom feed (see core.feeds.atom_feed), cached until the blog's next post write.
+
+    Args:
+        site_url: Absolute URL of the blog homepage.
+        feed_url: Absolute URL of the feed itself.
+        post_url: Callable mapping a post slug to its absolute URL.
+    """
+    return feed_cache.get_or_load(blog_feed_key(blog_id),
+                                  lambda: _build_blog_feed(db_name, blog_id, subdomain, site_url, feed_url, post_url))
+
+def _build_blog_feed(db_name, blog_id, subdomain, site_url, feed_url, post_url):
+    blog = get_blog_by_subdomain(subdomain)
+    host = current_app.config.get('BASE_DOMAIN', 'localhost:5000').split(':')[0] # Same ids as the platform feed's entries
+    entries = []
+    for post in db.get_feed_posts(db_name, blog_id, FEED_SIZE):
+        ensure_post_html(db_name, post)
+        link = post_url(post['slug'])
+        # Entries only re-render when the post changed (or the link did, e.g. a new slug)
+        key = ('post', post['id'], post['last_modified_timestamp'], post['content_html_key'], link)
+        entries.append((post['last_modified_timestamp'], cached_entry(key, lambda post=post, link=link: atom_entry(
+            tag_uri(host, f"{subdomain}/post/{post['id']}"), post['title'], link,
+            post['last_modified_timestamp'], post['creation_timestamp'], post['excerpt'], post['content_html']))))
+    updated = max((modified for modified, _ in entries), default=blog['creation_date'] if blog else datetime.now())
+    return atom_feed(tag_uri(host, f"{subdomain}/feed"),
+                     blog['blog_title'] if blog else subdomain, feed_url, site_url, updated, [entry for _, entry in entries])
+
+def iter_sitemap_urls(db_name, blog_id, shard, extra_urls, post_url):
+    """Yields the (URL, lastmod) pairs of one sitemap shard of a blog, reading posts in keyset chunks.
+
+    Args:
+        shard: 1-based shard number; shard 1 also lists `extra_urls` (homepage, tags...).
+        extra_urls: (URL, lastmod) pairs of the blog's non-post pages.
+        post_url: Callable mapping a post slug to its absolute URL.
+
+    Memory use is bounded by SITEMAP_CHUNK_SIZE rows whatever the blog's size. Each
+    chunk is read on a short-lived pooled connection that is committed and returned
+    before the chunk is yielded, so a slow client never holds a connection.
+    """
+    if shard == 1:
+        yield from extra_urls
+        after = None
+    else:
+        with pooled_connection(db_name) as conn:
+            after = db.get_sitemap_shard_start(conn, blog_id, (shard - 1) * SITEMAP_SHARD_SIZE - 1)
+            conn.commit() # End the read snapshot before the connection goes back to the pool
+        if after is None:
+            return
+    remaining = SITEMAP_SHARD_SIZE
+    while remaining > 0:
+        with pooled_connection(db_name) as conn:
+            posts = db.get_sitemap_posts(conn, blog_id, min(SITEMAP_CHUNK_SIZE, remaining), after)
+            conn.commit()
+        for post in posts:
+            yield post_url(post['slug']), post['last_modified_timestamp']
+        if len(posts) < min(SITEMAP_CHUNK_SIZE, remaining):
+            return
+        remaining -= len(posts)
+        after = (posts[-1]['creation_timestamp'], posts[-1]['id'])
+
+def parse_tags(tags_string):
+    """Splits a comma-separated tag string into unique (name, slug) pairs, keeping the first spelling of each slug."""
+    tags = {}
+    for tag_name in (tag.strip() for tag in (tags_string or '').split(',')):
+        if tag_name:
+            tags.setdefault(generate_slug_from_title(tag_name), tag_name)
+    return [(name, slug) for slug, name in tags.items()]
+
+def _unique_tag_ids(tag_ids):
+    # Two spellings can resolve to the same existing tag; post_tags allows each pair once
+    return list(dict.fromkeys(tag_id for tag_id in tag_ids if tag_id is not None))
+
+def sync_post_tags(db_name, blog_id, post_id, tags_string):
+    """Makes a post's tags match `tags_string`, only inserting or deleting the post_tags rows (and tag counts) that changed."""
+    new_tag_ids = set(_unique_tag_ids(db.get_or_create_tags(db_name, parse_tags(tags_string))))
+    old_tag_ids = set(db.get_tag_ids_for_post(db_name, post_id))
+    removed = sorted(old_tag_ids - new_tag_ids)
+    db.remove_post_tags(db_name, post_id, removed)
+    db.adjust_tag_usage(db_name, blog_id, removed, -1)
+    added = sorted(new_tag_ids - old_tag_ids)
+    if added:
+        db.add_post_tags(db_name, blog_id, post_id, added)
+        db.adjust_tag_usage(db_name, blog_id, added, 1)
+
+def ensure_post_html(db_name, post):
+    """Makes sure post['content_html'] is the current render of post['content'].
+
+    Posts store their sanitized HTML with the render key it was made from; a
+    stale or missing render (new renderer version, old post) is rendered once
+    here and stored, so later views only emit the stored HTML.
+    Returns True if the post had to be rendered.
+    """
+    key = content_render_key(post['content'])
+    if post.get('content_html') is not None and post.get('content_html_key') == key:
+        return False
+    post['content_html'] = render_post_html(post['content'])
+    post['content_html_key'] = key
+    try:
+        db.set_post_html(db_name, post['id'], post['content_html'], key)
+    except Exception as e:
+        print(f"Error storing rendered HTML for post {post['id']}: {e}") # Still served, rendered again next time
+    return True
+
+def get_post_page(db_name, blog_id, slug):
+    """Retrieves a post with its tags and approved comments (see db.get_post_page) and counts the view."""
+    post = db.get_post_page(db_name, blog_id, slug)
+    if post:
+        ensure_post_html(db_name, post)
+        post['view_count'] = (post['view_count'] or 0) + view_counts.pending_for(post['id'])
+        view_counts.add(post['id'])
+    return post
+
 def get_post_by_slug(db_name, blog_id, slug): # Added blog_id
     """Retrieves a post by its slug for a specific blog and increments view count."""
     post = db.get_post_by_slug(db_name, blog_id, slug)
     if post:
-        db.increment_post_view_count(db_name, post['id']) # post_id is global for increment
+        # Include views still buffered in this worker, then record this one (written behind, see view_counts.py)
+        post['view_count'] = (post['view_count'] or 0) + view_counts.pending_for(post['id'])
+        view_counts.add(post['id']) # post_id is global for increment
     return post
 
 def update_post(db_name, blog_id, post_id, title, content, tags_string): # Added blog_id
     """Updates an existing post and its tags for a specific blog."""
     slug = generate_slug_from_title(title)
 
-    db.update_post(db_name, blog_id, post_id, title, slug, content)
+    location = db.get_post_page_location(db_name, post_id) if page_cache.enabled or sitemap_cache.enabled else None
 
-    # Update tags
-    main_db_name = os.getenv('MYSQL_DATABASE', 'calimara_db') # Assuming tags are global, use main_db_name
-    execute_query(main_db_name, "DELETE FROM post_tags WHERE post_id = %s", (post_id,), commit=True)
-    tag_names = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-    tag_ids = []
-    for tag_name in tag_names:
-        tag_slug = generate_slug_from_title(tag_name)
-        tag_id = db.create_tag(main_db_name, tag_name, tag_slug) # Use main_db_name for global tags
-        tag_ids.append(tag_id)
+    with transaction(db_name):
+        excerpt, word_count = summarize_content(content)
+        db.update_post(db_name, blog_id, post_id, title, slug, content, excerpt, word_count,
+                       render_post_html(content), content_render_key(content))
+        sync_post_tags(db_name, blog_id, post_id, tags_string) # Tags are global
+        db.touch_blog(db_name, blog_id) # Index/sitemap validators
 
-    if tag_ids:
-        db.add_post_tags(main_db_name, post_id, tag_ids) # Use main_db_name for global post_tags
+    if location:
+        _invalidate_blog_pages(location['subdomain_name']) # Title/slug may show on the index too
+    invalidate_blog_feed(blog_id)
 
 def delete_post(db_name, blog_id, post_id, subdomain): # Added blog_id
     """Deletes a post for a specific blog and removes from shared index."""
-    db.delete_post(db_name, blog_id, post_id)
-
     # Remove from main database shared_posts_index
     # add_post_to_shared_index and related logic in platform_management.db already use main_db_name
     main_db_name_for_index = os.getenv('MYSQL_DATABASE', 'calimara_db')
@@ -105,7 +357,20 @@ def delete_post(db_name, blog_id, post_id, subdomain): # Added blog_id
     WHERE original_post_id_on_instance = %s AND blog_instance_subdomain = %s
     """
     args_index = (post_id, subdomain)
-    execute_query(main_db_name_for_index, query_index, args_index, commit=True)
+
+    with transaction(db_name):
+        # post_tags rows go with the post (ON DELETE CASCADE); their tag counts must go too,
+        # but only if the post was really deleted (it may belong to another blog)
+        tag_ids = db.get_tag_ids_for_post(db_name, post_id)
+        deleted = db.delete_post(db_name, blog_id, post_id)
+        if deleted:
+            db.adjust_tag_usage(db_name, blog_id, tag_ids, -1)
+            db.touch_blog(db_name, blog_id, -deleted)
+        execute_query(main_db_name_for_index, query_index, args_index, commit=True)
+    invalidate_shared_post_samples() # Don't keep suggesting the deleted post in sidebars
+    invalidate_platform_feed()
+    _invalidate_blog_pages(subdomain)
+    invalidate_blog_feed(blog_id)
 
 
 def add_comment(db_name, post_id, commenter_name, commenter_email, content): # db_name is main DB
@@ -116,15 +381,25 @@ def approve_comment(db_name, blog_id, comment_id, approved_by_user_id): # Added
     """Approves a pending comment for a specific blog."""
     # Potentially add a check here: does comment_id belong to a post in blog_id?
     db.approve_comment(db_name, comment_id, approved_by_user_id)
+    if page_cache.enabled:
+        _invalidate_post_page(db.get_comment_page_location(db_name, comment_id))
 
 def delete_comment(db_name, blog_id, comment_id): # Added blog_id for context
     """Deletes a comment for a specific blog."""
     # Potentially add a check here
+    location = db.get_comment_page_location(db_name, comment_id) if page_cache.enabled else None
     db.delete_comment(db_name, comment_id)
+    _invalidate_post_page(location)
 
 def add_like(db_name, post_id, liker_identifier): # db_name is main DB
-    """Adds a like to a post."""
-    db.add_like(db_name, post_id, liker_identifier)
+    """Adds a like to a post and bumps its like counter. Returns False if the liker had already liked it."""
+    with transaction(db_name): # The like and the counter change commit (or roll back) together
+        if not db.add_like(db_name, post_id, liker_identifier):
+            return False
+        db.increment_post_like_count(db_name, post_id)
+    if page_cache.enabled:
+        _invalidate_post_page(db.get_post_page_location(db_name, post_id))
+    return True
 
 def authenticate_user(db_name, email, password): # db_name is main DB
     """Authenticates a user from the global users table."""
@@ -145,6 +420,17 @@ def authenticate_user(db_name, email, password): # db_name is main DB
         print(f"[AUTH_DEBUG] User not found: {email}")
     return None
 
+# Page cache invalidation helpers (see core.response_cache)
+def _invalidate_blog_pages(subdomain):
+    """Drops every cached page of a blog (index, posts and sitemap shards)."""
+    page_cache.invalidate_namespace(subdomain)
+    invalidate_blog_sitemaps(subdomain)
+
+def _invalidate_post_page(location):
+    """Drops the cached page of one post, given its get_post_page_location() row."""
+    if location:
+        page_cache.invalidate_page(location['subdomain_name'], f"/posts/{location['slug']}")
+
 # Helper function for slug generation
 def generate_slug_from_title(title):
     """Generates a URL-friendly slug from a string."""
@@ -154,9 +440,16 @@ def generate_slug_from_title(title):
     slug = re.sub(r'-+', '-', slug)        # Replace multiple hyphens with single
     return slug.strip('-')
 
-def get_posts_with_stats(db_name, blog_id): # Added blog_id
-    """Retrieves posts for a specific blog with view and pending comment counts."""
-    return db.get_posts_with_stats(db_name, blog_id)
+def get_posts_with_stats(db_name, blog_id, page=1, per_page=None): # Added blog_id
+    """Retrieves one page of a blog's posts with view, like and pending comment counts.
+
+    Returns:
+        A (posts, total_post_count) tuple.
+    """
+    per_page = per_page or Config.DASHBOARD_POSTS_PER_PAGE
+    page = max(page, 1)
+    posts = db.get_posts_with_stats(db_name, blog_id, per_page, (page - 1) * per_page)
+    return posts, db.count_posts(db_name, blog_id)
 
 def get_pending_comments(db_name, blog_id): # Added blog_id
     """Retrieves pending comments for a specific blog."""
@@ -0,0 +1,121 @@
+import atexit
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from core.db_utils import pooled_connection
+from core.query_stats import query_logger
+from . import db
+
+# Load environment variables from .env file
+load_dotenv()
+
+MAIN_DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
+VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 10)) # Seconds between background flushes
+VIEW_COUNT_FLUSH_THRESHOLD = int(os.getenv('VIEW_COUNT_FLUSH_THRESHOLD', 500)) # Pending views that force a flush
+VIEW_COUNT_BATCH_SIZE = 500 # Posts per UPDATE statement
+
+class ViewCountBuffer:
+    """Write-behind accumulator for post view counts.
+
+    Views are added in memory per post_id and written with one multi-row
+    UPDATE per batch: every `flush_interval` seconds from a background
+    thread, as soon as `flush_threshold` views are pending, and when the
+    worker exits. A popular post thus costs one row update per flush instead
+    of one locked, committed UPDATE per page view.
+    """
+
+    def __init__(self, db_name, flush_interval=VIEW_COUNT_FLUSH_INTERVAL, flush_threshold=VIEW_COUNT_FLUSH_THRESHOLD):
+        self.db_name = db_name
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker must not flush (and double count) views buffered by its parent
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pending = {}
+        self._pending_views = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._pid = os.getpid()
+        self._stats = {'flushes': 0, 'flushed_views': 0, 'failed_flushes': 0, 'last_flush_at': None, 'last_error': None}
+
+    def add(self, post_id, count=1):
+        """Records `count` views of a post."""
+        if os.getpid() != self._pid: # Fallback for platforms without register_at_fork
+            self._reset()
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + count
+            self._pending_views += count
+            over_threshold = self._pending_views >= self.flush_threshold
+        self._ensure_flusher()
+        if over_threshold:
+            self.flush()
+
+    def pending_for(self, post_id):
+        """Views of a post recorded in this worker but not yet written to the database."""
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """Writes every pending view to the database. Failed batches are kept for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_views = 0
+            if not pending:
+                return
+
+            post_ids = list(pending)
+            for start in range(0, len(post_ids), VIEW_COUNT_BATCH_SIZE):
+                batch = {post_id: pending[post_id] for post_id in post_ids[start:start + VIEW_COUNT_BATCH_SIZE]}
+                try:
+                    # A dedicated connection: never mix these commits into a request's transaction
+                    with pooled_connection(self.db_name) as conn:
+                        db.add_post_view_counts(conn, batch)
+                    self._stats['flushes'] += 1
+                    self._stats['flushed_views'] += sum(batch.values())
+                except Exception as e:
+                    query_logger.error("Error flushing view counts (%d posts), will retry: %s", len(batch), e)
+                    self._stats['failed_flushes'] += 1
+                    self._stats['last_error'] = str(e)
+                    with self._lock:
+                        for post_id, count in batch.items():
+                            self._pending[post_id] = self._pending.get(post_id, 0) + count
+                            self._pending_views += count
+            self._stats['last_flush_at'] = time.time()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run_flusher, name='view-count-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if os.getpid() != self._pid:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                query_logger.error("Error in view count flusher: %s", e)
+
+    def stats(self):
+        """Returns the amount of unflushed data and flush counters for this worker."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['pending_posts'] = len(self._pending)
+            snapshot['pending_views'] = self._pending_views
+        snapshot['flush_interval'] = self.flush_interval
+        snapshot['flush_threshold'] = self.flush_threshold
+        return snapshot
+
+# Shared buffer for the main database
+view_counts = ViewCountBuffer(MAIN_DB_NAME)
@@ -10,6 +10,20 @@ class Config:
     MYSQL_USER = os.environ.get('MYSQL_USER', 'dangocan')
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', 'QuietUptown1801__')
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE', 'calimara_db')
+    # The connection pool is configured by environment variables only, read by core/db_utils.py
+    # when it is imported (before any app exists):
+    #   MYSQL_POOL_SIZE (default 5): connections per worker process and database
+    #   MYSQL_POOL_TIMEOUT (default 10): seconds to wait for a free connection
+    #   MYSQL_POOL_PING_AFTER (default 30): health-check connections idle this many seconds
+
+    # Per-request SQL instrumentation (see core/query_stats.py)
+    QUERY_STATS_HEADERS = os.environ.get('QUERY_STATS_HEADERS', 'false').lower() in ['true', 'on', '1'] # Server-Timing / X-DB-Queries, for debugging only
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200)) # Log statements at least this slow (0 disables)
+    REPEATED_QUERY_THRESHOLD = int(os.environ.get('REPEATED_QUERY_THRESHOLD', 10)) # Log a statement run this often in one request
+    QUERY_LOG_LIMIT = int(os.environ.get('QUERY_LOG_LIMIT', 200)) # Statements kept per request
+
+    # Internal stats endpoint (/_internal/stats), only answered for these client addresses
+    STATS_ALLOWED_IPS = os.environ.get('STATS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
 
     # Email Configuration (for Gmail)
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -19,6 +33,30 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'your_gmail_password') # Replace with your Gmail password or app password
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'Calimara Platform <noreply@calimara.ro>') # Replace with your desired sender name and email
 
+    # Full-page cache for anonymous blog pages (see core/response_cache.py)
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory') # 'memory', 'filesystem' or 'none'
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60)) # Seconds
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 1000)) # Max pages per worker (memory backend)
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR', None) # Required by the filesystem backend; must be private to the app user
+    PAGE_CACHE_MAX_FILES = int(os.environ.get('PAGE_CACHE_MAX_FILES', 10000)) # Max pages on disk (filesystem backend)
+
+    # Post view counts are buffered per worker and written in batches. The buffer is configured by
+    # environment variables only, read by blog_instance/view_counts.py when it is imported:
+    #   VIEW_COUNT_FLUSH_INTERVAL (default 10): seconds between background flushes
+    #   VIEW_COUNT_FLUSH_THRESHOLD (default 500): pending views that force a flush
+
+    # Posts per page on a blog's homepage
+    BLOG_POSTS_PER_PAGE = int(os.environ.get('BLOG_POSTS_PER_PAGE', 10))
+
+    # Results per page for blog and platform search
+    SEARCH_RESULTS_PER_PAGE = int(os.environ.get('SEARCH_RESULTS_PER_PAGE', 10))
+
+    # Posts per page in the admin dashboard listing
+    DASHBOARD_POSTS_PER_PAGE = int(os.environ.get('DASHBOARD_POSTS_PER_PAGE', 25))
+
+    # Mixed into every page ETag; bump it after template changes so clients refetch pages
+    ETAG_VERSION = os.environ.get('ETAG_VERSION', '1')
+
     # Server Name for subdomain handling (important for development)
     # In production, this is usually handled by the web server (Nginx)
     # For local testing with subdomains, you might need to set this and
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinel used to tell "not cached" apart from a cached None
+MISSING = object()
+
+class TTLCache:
+    """A bounded, thread-safe, in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Caches live per worker process, so invalidation only reaches the current
+    worker; keep TTLs short enough that other workers converge quickly.
+
+    Args:
+        maxsize: Maximum number of entries before the least recently used one is evicted.
+        ttl: Lifetime of a cached value, in seconds.
+        negative_ttl: Lifetime of a cached None (e.g. "no such blog"). If None, misses are not cached.
+        name: Label used in stats output.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, negative_ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.name = name
+        self._data = OrderedDict() # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0 # Bumped on every invalidation, see get_or_load()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, default=MISSING):
+        """Returns the cached value for `key`, or `default` if it is absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._data[key]
+            self._stats['misses'] += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Stores `value` under `key` for `ttl` seconds (defaults to the cache TTL)."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl is None or ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for `key`, calling `loader()` and caching its result on a miss.
+
+        If the cache is invalidated while `loader()` runs, the freshly loaded
+        value is returned but not stored, so a slow load can never put data
+        back into the cache that an invalidation was meant to remove.
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value, None)
+        return value
+
+    def invalidate(self, key):
+        """Drops `key` from the cache."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = len(self._data)
+        snapshot['name'] = self.name
+        snapshot['maxsize'] = self.maxsize
+        snapshot['ttl'] = self.ttl
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
+
+class LazySequence:
+    """A list-like proxy that calls `loader()` the first time it is read, then memoizes the result.
+
+    Meant for per-request values that only some templates use: assigning one
+    to `g` costs nothing, and the query only runs if a template iterates it,
+    tests its truthiness or takes its length.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def _get(self):
+        if not self._loaded:
+            self._value = list(self._loader() or [])
+            self._loaded = True
+        return self._value
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return len(self._get())
+
+    def __bool__(self):
+        return bool(self._get())
+
+    def __getitem__(self, index):
+        return self._get()[index]
+
+    def __repr__(self):
+        return f"LazySequence({self._value!r})" if self._loaded else "LazySequence(<not loaded>)"
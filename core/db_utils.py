@@ -1,7 +1,14 @@
 import mysql.connector
 from mysql.connector import errorcode
+import itertools
 import os
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import g, has_app_context
+from .query_stats import query_stats
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,6 +19,19 @@ DB_USER = os.getenv('MYSQL_USER', 'dangocan')
 DB_PASSWORD = os.getenv('MYSQL_PASSWORD', 'QuietUptown1801__')
 DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
 
+# Connection pool configuration (one pool per database, per worker process)
+POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 5)) # Max connections a worker keeps open per database
+POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 10)) # Seconds to wait for a free connection before giving up
+POOL_PING_AFTER = float(os.getenv('MYSQL_POOL_PING_AFTER', 30)) # Ping idle connections older than this on checkout
+
+BULK_BATCH_SIZE = int(os.getenv('MYSQL_BULK_BATCH_SIZE', 500)) # Rows per multi-row INSERT in bulk_insert()
+# Prepared statements for queries run with execute_query(..., prepared=True). Off by default:
+# mysql-connector resets a prepared statement before every execution, an extra round trip
+# that can cost more than the parsing it saves. Measure with benchmarks/bench_prepared.py first.
+PREPARED_STATEMENTS = os.getenv('MYSQL_PREPARED_STATEMENTS', '0').lower() in ('1', 'true', 'yes')
+PREPARED_CACHE_SIZE = int(os.getenv('MYSQL_PREPARED_CACHE_SIZE', 32)) # Statements kept prepared per connection
+STREAM_BATCH_SIZE = int(os.getenv('MYSQL_STREAM_BATCH_SIZE', 1000)) # Rows fetched per round trip by execute_query(stream=True)
+
 def get_db_connection(database=None):
     """Establishes and returns a mysql.connector.connection.MySQLConnection.
     
@@ -38,7 +58,304 @@ def dict_cursor(conn):
     cursor = conn.cursor(dictionary=True)
     return cursor
 
-def execute_query(conn_or_db_name, query, args=(), one=False, many=False, commit=False, last_row_id=False):
+# Cursor options for each row format of execute_query(stream=True)
+ROW_FORMATS = {
+    'dict': {'dictionary': True},
+    'tuple': {},
+    'namedtuple': {'named_tuple': True},
+}
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+    pass
+
+class ConnectionPool:
+    """A small thread-safe pool of MySQL connections for one database.
+
+    Connections are handed out LIFO so the warmest connection is reused first.
+    Idle connections are pinged on checkout once they have been idle for
+    longer than POOL_PING_AFTER seconds; dead ones are replaced transparently.
+    """
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.pid = os.getpid()
+        self._idle = deque() # (connection, released_at) pairs
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'failed_health_checks': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'open_connections': 0,
+            'in_use': 0,
+        }
+
+    def get_connection(self):
+        """Checks out a healthy connection, waiting up to `timeout` seconds for a free slot."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolExhaustedError(
+                f"No free connection for database '{self.database}' after {self.timeout}s (pool size {self.size})."
+            )
+        waited = time.monotonic() - started
+
+        try:
+            conn = self._take_idle_connection()
+            if conn is None:
+                conn = get_db_connection(self.database)
+                with self._lock:
+                    self._stats['connections_created'] += 1
+                    self._stats['open_connections'] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['total_wait_time'] += waited
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+        return conn
+
+    def _take_idle_connection(self):
+        """Pops idle connections until a healthy one is found. Returns None if none are left."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn, released_at = self._idle.pop()
+
+            if time.monotonic() - released_at < self.ping_after:
+                return conn
+            try:
+                conn.ping(reconnect=False)
+                return conn
+            except mysql.connector.Error:
+                with self._lock:
+                    self._stats['failed_health_checks'] += 1
+                self._close(conn)
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool, or closes it if it is broken or `discard` is set."""
+        try:
+            if not discard:
+                try:
+                    # fetchone() on an unbuffered cursor can leave rows behind
+                    if conn.unread_result:
+                        conn.consume_results()
+                    # Never hand out a connection with an open transaction (and its stale read snapshot)
+                    if conn.in_transaction:
+                        conn.rollback()
+                except mysql.connector.Error:
+                    discard = True
+
+            if discard or os.getpid() != self.pid:
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def _close(self, conn):
+        with self._lock:
+            self._stats['connections_discarded'] += 1
+            self._stats['open_connections'] -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass # The connection is already unusable, nothing else to clean up
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['idle'] = len(self._idle)
+        snapshot['database'] = self.database
+        snapshot['size'] = self.size
+        snapshot['pid'] = self.pid
+        snapshot['avg_wait_time'] = snapshot['total_wait_time'] / snapshot['checkouts'] if snapshot['checkouts'] else 0.0
+        return snapshot
+
+# Pools are per process: a forked worker must never reuse sockets inherited from its parent.
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+def _reset_pools_after_fork():
+    """Drops (without closing) every pool inherited from the parent process."""
+    global _pools, _pools_lock, _pools_pid
+    _pools = {}
+    _pools_lock = threading.Lock()
+    _pools_pid = os.getpid()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+def get_pool(database):
+    """Returns this process's connection pool for `database`, creating it on first use."""
+    if os.getpid() != _pools_pid: # Fallback for platforms without register_at_fork
+        _reset_pools_after_fork()
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = ConnectionPool(database)
+                _pools[database] = pool
+    return pool
+
+def get_pool_stats():
+    """Returns stats for every pool in this worker, keyed by database name."""
+    return {database: pool.stats() for database, pool in list(_pools.items())}
+
+@contextmanager
+def pooled_connection(database):
+    """Context manager that checks a connection out of the pool and always returns it.
+
+    Usage:
+        with pooled_connection(db_name) as conn:
+            ...
+    """
+    pool = get_pool(database)
+    conn = pool.get_connection()
+    discard = False
+    try:
+        yield conn
+    except mysql.connector.Error:
+        discard = not _is_usable(conn)
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+def _is_usable(conn):
+    """Checks whether a connection survived an error and can go back to the pool."""
+    try:
+        return conn.is_connected()
+    except Exception:
+        return False
+
+# --- Request-scoped connections and transactions ---
+# Inside a Flask app context every query for a database shares one connection,
+# bound to `g` and handed back to the pool by release_request_connections()
+# (registered as a teardown hook in app.py). Outside an app context (scripts,
+# background threads) connections are only bound for the duration of a
+# transaction() block, and otherwise borrowed per query.
+
+_local = threading.local()
+
+def _connection_scope():
+    """Returns the object that holds bound connections: `g` in an app context, a thread-local otherwise."""
+    return g if has_app_context() else _local
+
+def _scope_dict(name):
+    scope = _connection_scope()
+    value = getattr(scope, name, None)
+    if value is None:
+        value = {}
+        setattr(scope, name, value)
+    return value
+
+def _bound_connection(database):
+    """Returns the connection bound to the current request/transaction for `database`, or None."""
+    connections = _scope_dict('_db_connections')
+    conn = connections.get(database)
+    if conn is None and has_app_context():
+        conn = get_pool(database).get_connection()
+        connections[database] = conn
+    return conn
+
+def in_transaction(database):
+    """True while a transaction() block for `database` is open in the current scope."""
+    return _scope_dict('_db_transaction_depth').get(database, 0) > 0
+
+def release_request_connections(exc=None):
+    """Teardown hook: rolls back anything left uncommitted and returns request connections to the pool."""
+    connections = getattr(g, '_db_connections', None) or {}
+    for database, conn in list(connections.items()):
+        discard = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            discard = True
+        get_pool(database).release(conn, discard=discard or not _is_usable(conn))
+    connections.clear()
+    g._db_transaction_depth = {}
+
+@contextmanager
+def connection(database):
+    """Yields the connection bound to the current scope, or a pooled one for the duration of the block."""
+    conn = _bound_connection(database)
+    if conn is not None:
+        yield conn
+        return
+    with pooled_connection(database) as conn:
+        yield conn
+
+@contextmanager
+def transaction(database):
+    """Runs the enclosed queries as one atomic unit of work with a single commit.
+
+    execute_query(database, ..., commit=True) calls inside the block do not
+    commit on their own; the block commits once on success and rolls back if
+    an exception escapes it. Nested blocks join the outermost transaction.
+
+    Usage:
+        with transaction(db_name):
+            post_id = db.create_post(db_name, ...)
+            db.add_post_tags(db_name, blog_id, post_id, tag_ids)
+    """
+    depths = _scope_dict('_db_transaction_depth')
+    connections = _scope_dict('_db_connections')
+    owned = False
+
+    conn = _bound_connection(database)
+    if conn is None:
+        # Outside a request: bind a pooled connection to this thread until the block ends
+        conn = get_pool(database).get_connection()
+        connections[database] = conn
+        owned = True
+
+    outermost = depths.get(database, 0) == 0
+    discard = False
+    try:
+        if outermost and conn.in_transaction:
+            conn.commit() # Close any read-only snapshot left open by earlier queries in this request
+        depths[database] = depths.get(database, 0) + 1
+        try:
+            yield conn
+        finally:
+            depths[database] -= 1
+
+        if outermost:
+            conn.commit()
+    except BaseException:
+        if outermost:
+            try:
+                conn.rollback()
+            except mysql.connector.Error:
+                discard = True
+        raise
+    finally:
+        if owned:
+            connections.pop(database, None)
+            get_pool(database).release(conn, discard=discard or not _is_usable(conn))
+
+def execute_query(conn_or_db_name, query, args=(), one=False, many=False, commit=False, last_row_id=False, rowcount=False,
+                  stream=False, batch_size=None, row_format='dict', prepared=False):
     """
     A versatile helper for executing SQL queries.
 
@@ -48,25 +365,96 @@ def execute_query(conn_or_db_name, query, args=(), one=False, many=False, commit
         args: A tuple of arguments to substitute into the query.
         one: If True, fetch a single row.
         many: If True, fetch all rows.
-        commit: If True, commit the transaction.
+        commit: If True, commit the transaction (deferred to the end of an open transaction() block).
         last_row_id: If True, return the last inserted row ID.
+        rowcount: If True, return the number of rows affected (e.g. 0 for an ignored INSERT IGNORE).
+        stream: If True, return a generator over the rows instead of a list (see _stream_query).
+        batch_size: Rows fetched per round trip when streaming (default MYSQL_STREAM_BATCH_SIZE).
+        row_format: Row type when streaming: 'dict', 'tuple' or 'namedtuple'.
+        prepared: Marks a hot query: with MYSQL_PREPARED_STATEMENTS on, it runs as a server-side
+                  prepared statement kept per connection (see _prepared_cursor).
 
     Returns:
-        The result of the query (single row, list of rows, last row ID, or None).
+        The result of the query (single row, list of rows, row generator, last row ID, row count, or None).
     """
-    conn = None
+    if stream:
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"Unknown row_format '{row_format}'. Use 'dict', 'tuple' or 'namedtuple'.")
+        return _stream_query(conn_or_db_name, query, args, batch_size or STREAM_BATCH_SIZE, row_format)
+    if isinstance(conn_or_db_name, str):
+        # If a string is provided, treat it as a database name and use the request/transaction
+        # connection, or borrow one from the pool
+        managed = in_transaction(conn_or_db_name)
+        with connection(conn_or_db_name) as conn:
+            return _run_query(conn, query, args, one, many, commit and not managed, last_row_id, rowcount,
+                              rollback_on_error=not managed, prepared=prepared)
+    # Otherwise, use the provided connection
+    return _run_query(conn_or_db_name, query, args, one, many, commit, last_row_id, rowcount, rollback_on_error=False,
+                      prepared=prepared)
+
+_prepared_stats_lock = threading.Lock()
+_prepared_stats = {'hits': 0, 'prepares': 0, 'evictions': 0}
+
+def get_prepared_stats():
+    """Returns this worker's prepared statement cache counters."""
+    with _prepared_stats_lock:
+        snapshot = dict(_prepared_stats)
+    snapshot['enabled'] = PREPARED_STATEMENTS
+    snapshot['cache_size'] = PREPARED_CACHE_SIZE
+    return snapshot
+
+def _count_prepared(name):
+    with _prepared_stats_lock:
+        _prepared_stats[name] += 1
+
+def _prepared_cursor(conn, query):
+    """Returns the connection's prepared cursor for `query`, preparing it on first use.
+
+    Each connection keeps an LRU of at most PREPARED_CACHE_SIZE statements;
+    the least recently used one is deallocated on the server when a new one
+    is prepared. Statements live as long as the connection, so they are
+    reused across requests through the pool.
+    """
+    cache = getattr(conn, '_prepared_cursors', None)
+    if cache is None:
+        cache = OrderedDict() # query -> (cursor, query object it was prepared from)
+        conn._prepared_cursors = cache
+    entry = cache.get(query)
+    if entry is not None:
+        cache.move_to_end(query)
+        _count_prepared('hits')
+        return entry
+    while len(cache) >= PREPARED_CACHE_SIZE:
+        _, (old_cursor, _) = cache.popitem(last=False)
+        _count_prepared('evictions')
+        try:
+            old_cursor.close() # Deallocates the server-side statement
+        except mysql.connector.Error:
+            pass
+    # The connector re-prepares whenever it is handed a different string object, so the
+    # object the statement was prepared from is kept and passed on every execution.
+    # A plain prepared cursor: prepared=True with dictionary=True needs Connector/Python 8.0.23+.
+    entry = (conn.cursor(prepared=True), query)
+    cache[query] = entry
+    _count_prepared('prepares')
+    return entry
+
+def _forget_prepared(conn, query):
+    """Drops a statement from the connection's cache after an error, so the next call prepares it afresh."""
+    entry = getattr(conn, '_prepared_cursors', {}).pop(query, None)
+    if entry is not None:
+        try:
+            entry[0].close()
+        except mysql.connector.Error:
+            pass
+
+def _run_query(conn, query, args, one, many, commit, last_row_id, rowcount, rollback_on_error, prepared=False):
+    if prepared and PREPARED_STATEMENTS:
+        return _run_prepared(conn, query, args, one, many, commit, last_row_id, rowcount, rollback_on_error)
     cursor = None
-    close_conn = False
-    
+    rows = None # Rows returned or affected, for query_stats
+    started = time.perf_counter()
     try:
-        if isinstance(conn_or_db_name, str):
-            # If a string is provided, treat it as a database name
-            conn = get_db_connection(conn_or_db_name)
-            close_conn = True
-        else:
-            # Otherwise, use the provided connection
-            conn = conn_or_db_name
-            
         cursor = dict_cursor(conn)
         cursor.execute(query, args)
 
@@ -74,25 +462,216 @@ def execute_query(conn_or_db_name, query, args=(), one=False, many=False, commit
             conn.commit()
 
         if last_row_id:
-            return cursor.lastrowid
+            result = cursor.lastrowid
+        elif rowcount:
+            result = cursor.rowcount
         elif one:
-            return cursor.fetchone()
+            result = cursor.fetchone()
+            rows = 1 if result else 0
         elif many:
-            return cursor.fetchall()
+            result = cursor.fetchall()
+            rows = len(result)
         else:
-            return None # For INSERT, UPDATE, DELETE without last_row_id
+            result = None # For INSERT, UPDATE, DELETE without last_row_id
+        if rows is None:
+            rows = cursor.rowcount
+        return result
 
     except mysql.connector.Error as e:
-        print(f"Database error: {e}")
-        if conn and close_conn:
+        query_stats.error(query, e)
+        if rollback_on_error:
             conn.rollback()
         raise # Re-raise the exception after handling
 
     finally:
         if cursor:
             cursor.close()
-        if conn and close_conn:
-            conn.close()
+        query_stats.record(query, time.perf_counter() - started, rows)
+
+def _prepared_dicts(cursor, rows):
+    """Turns a prepared cursor's tuples into dicts, like execute_query's other rows."""
+    columns = cursor.column_names
+    return [dict(zip(columns, row)) for row in rows]
+
+def _run_prepared(conn, query, args, one, many, commit, last_row_id, rowcount, rollback_on_error):
+    cursor, prepared_query = _prepared_cursor(conn, query)
+    rows = None
+    started = time.perf_counter()
+    try:
+        cursor.execute(prepared_query, tuple(args))
+
+        if commit:
+            conn.commit()
+
+        if last_row_id:
+            result = cursor.lastrowid
+        elif rowcount:
+            result = cursor.rowcount
+        elif one:
+            fetched = _prepared_dicts(cursor, cursor.fetchall()) # Read the whole result, the cursor stays open for the next call
+            result = fetched[0] if fetched else None
+            rows = len(fetched)
+        elif many:
+            result = _prepared_dicts(cursor, cursor.fetchall())
+            rows = len(result)
+        else:
+            result = None
+        if rows is None:
+            rows = cursor.rowcount
+        return result
+
+    except mysql.connector.Error as e:
+        query_stats.error(query, e)
+        _forget_prepared(conn, query)
+        if rollback_on_error:
+            conn.rollback()
+        raise
+
+    finally:
+        query_stats.record(query, time.perf_counter() - started, rows)
+
+def bulk_insert(conn_or_db_name, table, columns, rows, ignore=False, on_duplicate_update=None, batch_size=None, commit=True):
+    """
+    Inserts many rows with multi-row INSERT statements, batch_size rows per statement.
+
+    Args:
+        conn_or_db_name: A MySQL connection object or a database name string.
+        table: Table name (a trusted identifier, never user input).
+        columns: Column names, in the order of each row's values.
+        rows: Iterable of value tuples; consumed lazily, so a generator keeps memory bounded.
+        ignore: If True, use INSERT IGNORE (rows hitting a unique key are skipped).
+        on_duplicate_update: Columns to overwrite with the inserted value on a duplicate key,
+            or a dict {column: SQL expression}, e.g. {'post_count': 'post_count + VALUES(post_count)'}.
+        batch_size: Rows per statement (default MYSQL_BULK_BATCH_SIZE).
+        commit: If True, commit after each batch (deferred to the end of an open transaction() block).
+
+    Returns:
+        The total number of affected rows as MySQL reports it (0 for an ignored row,
+        2 for a row changed by ON DUPLICATE KEY UPDATE).
+    """
+    prefix = f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+    suffix = ''
+    if on_duplicate_update:
+        if not isinstance(on_duplicate_update, dict):
+            on_duplicate_update = {column: f"VALUES({column})" for column in on_duplicate_update}
+        suffix = ' ON DUPLICATE KEY UPDATE ' + ', '.join(f"{column} = {expression}" for column, expression in on_duplicate_update.items())
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+
+    rows = iter(rows)
+    affected = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size or BULK_BATCH_SIZE))
+        if not batch:
+            return affected
+        query = prefix + ', '.join([row_placeholder] * len(batch)) + suffix
+        args = tuple(value for row in batch for value in row)
+        affected += execute_query(conn_or_db_name, query, args, commit=commit, rowcount=True)
+
+def _stream_query(conn_or_db_name, query, args, batch_size, row_format):
+    """Yields the rows of a SELECT from an unbuffered cursor, batch_size rows per fetchmany() round trip.
+
+    Only one batch is held in memory at a time. The query runs when iteration
+    starts, not when execute_query() returns.
+
+    With a database name the rows are read over a dedicated pooled connection,
+    so the caller can keep running other queries while iterating (inside a
+    transaction() block the transaction's connection is used instead, and no
+    other query may run on it until the generator is exhausted or closed).
+    If the consumer stops early, the unread rest of the result is dropped:
+    a dedicated connection is closed rather than drained, a caller-supplied
+    one is drained so it stays usable.
+    """
+    if isinstance(conn_or_db_name, str) and not in_transaction(conn_or_db_name):
+        pool = get_pool(conn_or_db_name)
+        conn = pool.get_connection()
+        finished = False
+        try:
+            yield from _stream_rows(conn, query, args, batch_size, row_format, drain=False)
+            finished = True
+        finally:
+            pool.release(conn, discard=not finished or not _is_usable(conn))
+        return
+    if isinstance(conn_or_db_name, str):
+        with connection(conn_or_db_name) as conn:
+            yield from _stream_rows(conn, query, args, batch_size, row_format, drain=True)
+        return
+    yield from _stream_rows(conn_or_db_name, query, args, batch_size, row_format, drain=True)
+
+def _stream_rows(conn, query, args, batch_size, row_format, drain):
+    cursor = None
+    exhausted = False
+    streamed = 0
+    db_time = 0.0 # Time spent in the driver only, not in the consumer between batches
+    try:
+        started = time.perf_counter()
+        cursor = conn.cursor(buffered=False, **ROW_FORMATS[row_format])
+        cursor.execute(query, args)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            db_time += time.perf_counter() - started
+            if not rows:
+                exhausted = True
+                return
+            streamed += len(rows)
+            yield from rows
+            started = time.perf_counter()
+
+    except mysql.connector.Error as e:
+        query_stats.error(query, e)
+        raise
+
+    finally:
+        if cursor:
+            if exhausted or drain:
+                try:
+                    if conn.unread_result:
+                        conn.consume_results() # Reads and drops the remaining rows
+                    cursor.close()
+                except mysql.connector.Error:
+                    pass # Left for the pool's release() to detect
+            # Otherwise the connection is about to be closed: reading the rest would only waste time
+        query_stats.record(query, db_time, streamed)
+
+def execute_multi(conn_or_db_name, query, args=()):
+    """
+    Runs several `;`-separated statements in a single round trip to the server.
+
+    Args:
+        conn_or_db_name: A MySQL connection object or a database name string.
+        query: The SQL statements, separated by semicolons.
+        args: A tuple of arguments for all placeholders, in order across the statements.
+
+    Returns:
+        A list with the rows (as dicts) of each statement that returns rows, in order.
+    """
+    if isinstance(conn_or_db_name, str):
+        with connection(conn_or_db_name) as conn:
+            return _run_multi(conn, query, args)
+    return _run_multi(conn_or_db_name, query, args)
+
+def _run_multi(conn, query, args):
+    cursor = None
+    result_sets = None
+    started = time.perf_counter()
+    try:
+        cursor = dict_cursor(conn)
+        result_sets = []
+        # mysql-connector < 9 yields one cursor state per statement
+        for result in cursor.execute(query, args, multi=True):
+            if result.with_rows:
+                result_sets.append(result.fetchall())
+        return result_sets
+
+    except mysql.connector.Error as e:
+        query_stats.error(query, e)
+        result_sets = None
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        query_stats.record(query, time.perf_counter() - started,
+                           sum(len(rows) for rows in result_sets) if result_sets is not None else None)
 
 def init_db_from_schema(db_name, schema_file_path):
     """Creates and initializes a database from a .sql schema file."""
@@ -0,0 +1,107 @@
+import hashlib
+import os
+from datetime import timezone
+from xml.sax.saxutils import escape, quoteattr
+from dotenv import load_dotenv
+from flask import request, make_response
+from .cache_utils import TTLCache
+from .http_utils import set_validators
+
+# Load environment variables from .env file
+load_dotenv()
+
+ATOM_CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+
+# Whole feeds, kept until the next post write invalidates them. Invalidation only reaches
+# the worker that made the write, so FEED_CACHE_TTL bounds staleness on the other workers.
+feed_cache = TTLCache(
+    maxsize=int(os.getenv('FEED_CACHE_SIZE', 1024)),
+    ttl=int(os.getenv('FEED_CACHE_TTL', 300)),
+    name='feeds'
+)
+
+# Rendered <entry> fragments keyed by everything they show, so a feed rebuilt after a write
+# only renders the entries that are new or changed and reuses the others.
+entry_cache = TTLCache(
+    maxsize=int(os.getenv('FEED_ENTRY_CACHE_SIZE', 8192)),
+    ttl=int(os.getenv('FEED_ENTRY_CACHE_TTL', 3600)),
+    name='feed_entries'
+)
+
+PLATFORM_FEED_KEY = ('platform',)
+
+def blog_feed_key(blog_id):
+    return ('blog', blog_id)
+
+def invalidate_blog_feed(blog_id):
+    """Drops a blog's cached feed (call after any write to its posts)."""
+    feed_cache.invalidate(blog_feed_key(blog_id))
+
+def invalidate_platform_feed():
+    """Drops the cached platform feed (call after shared_posts_index changes)."""
+    feed_cache.invalidate(PLATFORM_FEED_KEY)
+
+def _timestamp(value):
+    """RFC 3339 timestamp for Atom. Naive datetimes from MySQL are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def atom_entry(entry_id, title, link, updated, published=None, summary=None, content_html=None, author=None):
+    """Renders one Atom <entry> element."""
+    parts = [
+        '<entry>',
+        f'<id>{escape(entry_id)}</id>',
+        f'<title>{escape(title)}</title>',
+        f'<link rel="alternate" type="text/html" href={quoteattr(link)}/>',
+        f'<updated>{_timestamp(updated)}</updated>',
+    ]
+    if published is not None:
+        parts.append(f'<published>{_timestamp(published)}</published>')
+    if author:
+        parts.append(f'<author><name>{escape(author)}</name></author>')
+    if summary:
+        parts.append(f'<summary>{escape(summary)}</summary>')
+    if content_html:
+        parts.append(f'<content type="html">{escape(content_html)}</content>')
+    parts.append('</entry>')
+    return ''.join(parts)
+
+def cached_entry(key, render):
+    """Returns the <entry> fragment cached under `key`, rendering it with `render()` on a miss."""
+    return entry_cache.get_or_load(key, render)
+
+def atom_feed(feed_id, title, feed_url, site_url, updated, entries, author=None):
+    """Assembles an Atom feed document from already rendered <entry> fragments.
+
+    Returns:
+        A dict with the 'body' (bytes), its 'etag' and 'last_modified' (the newest entry's update time).
+    """
+    body = ''.join([
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f'<id>{escape(feed_id)}</id>',
+        f'<title>{escape(title)}</title>',
+        f'<link rel="self" type="application/atom+xml" href={quoteattr(feed_url)}/>',
+        f'<link rel="alternate" type="text/html" href={quoteattr(site_url)}/>',
+        f'<updated>{_timestamp(updated)}</updated>',
+        f'<author><name>{escape(author or title)}</name></author>', # Atom needs one, entries inherit it
+        *entries,
+        '</feed>',
+    ]).encode('utf-8')
+    return {'body': body, 'etag': hashlib.sha1(body).hexdigest(), 'last_modified': updated}
+
+def feed_response(feed):
+    """Serves a feed from atom_feed() with ETag/Last-Modified, answering matching conditional requests with 304."""
+    response = make_response(feed['body'])
+    response.content_type = ATOM_CONTENT_TYPE
+    set_validators(response, feed['etag'], feed['last_modified'], public=True) # Feeds carry no per-visitor data
+    return response.make_conditional(request)
+
+# Date part of every tag: URI we mint. Fixed, so an entry's id never depends on timestamps
+# that differ between the blog database and shared_posts_index.
+TAG_URI_DATE = '2024-01-01'
+
+def tag_uri(host, specific):
+    """A permanent Atom id (RFC 4151), e.g. tag:calimara.ro,2024-01-01:myblog/post/42."""
+    return f"tag:{host},{TAG_URI_DATE}:{specific}"
@@ -0,0 +1,146 @@
+import hashlib
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+from markupsafe import Markup
+
+# Bump when render_post_html() output changes: every stored render then stops matching
+# its key and is re-rendered on next read (or by `python maintenance.py render-posts`).
+RENDERER_VERSION = 1
+
+# Tags and attributes allowed in rendered posts; everything else is dropped (text is kept)
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'strong', 'sub', 'sup', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_URL_SCHEMES = {'http', 'https', 'mailto'}
+# Elements removed together with their content
+DROPPED_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template'}
+
+_BLOCK_TAG_RE = re.compile(r'<\s*(p|div|br|ul|ol|li|h[1-6]|blockquote|pre|table)\b', re.IGNORECASE)
+
+# Browsers drop tabs/newlines anywhere in a URL and control characters or spaces around it
+# (WHATWG URL parsing), so "java\tscript:" still runs: strip them all before reading the scheme.
+_URL_IGNORED_CHARS_RE = re.compile(r'[\x00-\x20\x7f]+')
+_URL_SCHEME_RE = re.compile(r'([a-z][a-z0-9+.-]*):')
+
+def _is_safe_url(url):
+    """Allows http/https/mailto URLs and explicitly relative ones (/, #, ? or a path without ':')."""
+    url = _URL_IGNORED_CHARS_RE.sub('', url).lower()
+    if url == '' or url[0] in '/#?':
+        return True
+    scheme = _URL_SCHEME_RE.match(url)
+    if scheme:
+        return scheme.group(1) in ALLOWED_URL_SCHEMES
+    # No scheme: only a relative path whose first segment has no ':' (which could be read as one)
+    return ':' not in re.split(r'[/?#]', url, maxsplit=1)[0]
+
+class _Sanitizer(HTMLParser):
+    """Rebuilds HTML keeping only allowlisted tags/attributes and balancing open tags."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        self.dropping = 0 # Depth inside a DROPPED_CONTENT_TAGS element
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        if tag in ('li', 'p') and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag) # <li>one<li>two: the second item implicitly closes the first
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = ''
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _is_safe_url(value):
+                continue
+            rendered += f' {name}="{escape(value, quote=True)}"'
+        if tag == 'a':
+            rendered += ' rel="nofollow noopener"'
+        self.out.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element first
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        return ''.join(self.out + [f'</{tag}>' for tag in reversed(self.open_tags)])
+
+def sanitize_html(content):
+    """Returns `content` with only allowlisted tags and attributes, all tags balanced."""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(content or '')
+    return sanitizer.result()
+
+def render_post_html(content):
+    """Renders a post body for display: sanitized HTML, or paragraphs and line breaks for plain text."""
+    content = content or ''
+    if not _BLOCK_TAG_RE.search(content):
+        # Plain text (textarea input): blank lines separate paragraphs, single newlines are line breaks
+        paragraphs = [p.strip() for p in re.split(r'\r?\n\s*\r?\n', content) if p.strip()]
+        content = ''.join('<p>' + re.sub(r'\r?\n', '<br>', p) + '</p>' for p in paragraphs)
+    return sanitize_html(content)
+
+def content_render_key(content):
+    """Key of a stored render: changes when the content or RENDERER_VERSION changes."""
+    return hashlib.sha1(f"{RENDERER_VERSION}:{content or ''}".encode('utf-8')).hexdigest()
+
+def html_to_text(content):
+    """Returns the visible text of an HTML fragment: tags stripped, entities decoded, whitespace collapsed."""
+    return ' '.join(unescape(re.sub(r'<[^>]*>', ' ', content or '')).split())
+
+def highlight_snippet(text, terms, width=200):
+    """Cuts a `width`-character window of plain `text` around the first matching term and marks every match.
+
+    Returns escaped Markup with matches wrapped in <mark>, safe to emit in templates.
+    """
+    terms = [term for term in terms if term]
+    alternatives = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    pattern = re.compile(rf'\b(?:{alternatives})', re.IGNORECASE) if terms else None # Words starting with a term
+    first = pattern.search(text) if pattern else None
+    start = max(first.start() - width // 3, 0) if first else 0
+    if start:
+        start = text.find(' ', start) + 1 or start # Don't start mid-word
+    snippet = text[start:start + width]
+    if start + width < len(text):
+        snippet = snippet.rsplit(' ', 1)[0]
+    parts, last = [], 0
+    for match in (pattern.finditer(snippet) if pattern else []):
+        parts.append(escape(snippet[last:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(escape(snippet[last:]))
+    return Markup(('&hellip;' if start else '') + ''.join(parts) + ('&hellip;' if start + width < len(text) else ''))
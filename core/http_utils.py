@@ -0,0 +1,45 @@
+import hashlib
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+def compute_etag(*parts):
+    """Builds an ETag from cheap page validators (ids, timestamps, counters).
+
+    The viewer (anonymous or user id) and the ETAG_VERSION config value are
+    always mixed in, so logged-in and anonymous renders never share an ETag
+    and bumping ETAG_VERSION on a template change retires every old one.
+    """
+    viewer = current_user.get_id() if current_user.is_authenticated else 'anon'
+    raw = '|'.join(str(part) for part in (current_app.config.get('ETAG_VERSION', '1'), viewer) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def not_modified_response(etag, last_modified=None, public=False):
+    """Returns a 304 response if the request's If-None-Match/If-Modified-Since match, else None.
+
+    Call it before doing any rendering work. Only GET/HEAD requests without
+    pending flash messages are eligible.
+    """
+    if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    response = make_response('', 304)
+    set_validators(response, etag, last_modified, public=public)
+    return response
+
+def set_validators(response, etag, last_modified=None, public=False):
+    """Adds ETag/Last-Modified to a response and asks caches to revalidate before reuse.
+
+    Pages carrying a per-session CSRF token must stay `public=False`, so that
+    shared caches (CDN) don't hand one visitor's form token to another.
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    return response
@@ -0,0 +1,125 @@
+import functools
+import logging
+import re
+import threading
+from collections import Counter
+from flask import g, request, has_app_context, has_request_context
+
+# Failed, slow and repeated statements are logged here (configure the handler/level like any logger)
+query_logger = logging.getLogger('calimara.queries')
+
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,)+\s*%s\s*\)', re.IGNORECASE)
+_ROW_LIST_RE = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=1024) # Hot statements are the same few strings over and over
+def normalize_sql(query):
+    """Collapses a statement to its shape: literals become ?, IN lists and multi-row VALUES become one item + `...`.
+
+    Two calls of the same code path normalize to the same text whatever
+    their arguments or list lengths, so they can be counted together.
+    """
+    normalized = _WHITESPACE_RE.sub(' ', query).strip()
+    normalized = _LITERAL_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('IN (%s, ...)', normalized)
+    return _ROW_LIST_RE.sub(r'\1, ...', normalized)
+
+class QueryStats:
+    """Per-request record of the SQL a request ran, plus a slow-query log.
+
+    execute_query() and friends call record() for every statement. Within a
+    request the statements are collected on `g`; after the request the
+    totals can be added as `Server-Timing` and `X-DB-Queries` headers, and any
+    statement repeated REPEATED_QUERY_THRESHOLD times (an N+1 pattern) is
+    logged. Failed statements and statements slower than SLOW_QUERY_MS are
+    logged wherever they run, tagged with the request's endpoint (or the
+    thread name outside requests).
+
+    Configured from app config in init_app():
+        QUERY_STATS_HEADERS: Add the response headers (default False; they reveal
+            query counts and timings to every client, so enable them for debugging only)
+        SLOW_QUERY_MS: Slow-query log threshold in milliseconds (default 200, 0 disables)
+        REPEATED_QUERY_THRESHOLD: Same statement this often in one request is logged (default 10, 0 disables)
+        QUERY_LOG_LIMIT: Statements kept per request for inspection (default 200; totals count all)
+    """
+
+    def __init__(self, app=None):
+        self.headers = False
+        self.slow_query_ms = 200.0
+        self.repeated_threshold = 10
+        self.log_limit = 200
+        self._lock = threading.Lock()
+        self._stats = {'queries': 0, 'errors': 0, 'slow_queries': 0, 'repeated_query_warnings': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.headers = bool(app.config.get('QUERY_STATS_HEADERS', False))
+        self.slow_query_ms = float(app.config.get('SLOW_QUERY_MS', 200))
+        self.repeated_threshold = int(app.config.get('REPEATED_QUERY_THRESHOLD', 10))
+        self.log_limit = int(app.config.get('QUERY_LOG_LIMIT', 200))
+        app.after_request(self._after_request)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _origin():
+        if has_request_context():
+            return request.endpoint or request.path
+        return threading.current_thread().name
+
+    def record(self, query, duration, rows):
+        """Records one statement: `duration` in seconds, `rows` returned/affected (None if it failed)."""
+        duration_ms = duration * 1000
+        self._count('queries')
+        if has_app_context():
+            collected = g.get('_query_stats')
+            if collected is None:
+                collected = g._query_stats = {'count': 0, 'total_ms': 0.0, 'queries': []}
+            collected['count'] += 1
+            collected['total_ms'] += duration_ms
+            if len(collected['queries']) < self.log_limit:
+                collected['queries'].append({'sql': query, 'ms': duration_ms, 'rows': rows})
+        if self.slow_query_ms and duration_ms >= self.slow_query_ms:
+            self._count('slow_queries')
+            query_logger.warning("Slow query (%.1f ms, %s rows) in %s: %s",
+                                      duration_ms, rows, self._origin(), normalize_sql(query))
+
+    def error(self, query, error):
+        """Logs a statement that failed with `error` (the caller still raises it)."""
+        self._count('errors')
+        query_logger.error("Database error in %s: %s; query: %s", self._origin(), error, normalize_sql(query))
+
+    def current(self):
+        """Returns this request's {'count', 'total_ms', 'queries'} (each query a {'sql', 'ms', 'rows'} dict), or None."""
+        return g.get('_query_stats') if has_app_context() else None
+
+    def _after_request(self, response):
+        collected = self.current()
+        count = collected['count'] if collected else 0
+        total_ms = collected['total_ms'] if collected else 0.0
+        if self.headers:
+            # Statements run while a streamed body is generated come after this and aren't included
+            response.headers['X-DB-Queries'] = str(count)
+            response.headers.add('Server-Timing', f'db;dur={total_ms:.1f};desc="{count} queries"')
+        if collected and self.repeated_threshold:
+            repeated = Counter(normalize_sql(entry['sql']) for entry in collected['queries'])
+            for sql, times in repeated.items():
+                if times >= self.repeated_threshold:
+                    self._count('repeated_query_warnings')
+                    query_logger.warning("Query repeated %d times in %s (N+1?): %s", times, self._origin(), sql)
+        return response
+
+    def stats(self):
+        """Returns this worker's counters and settings."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['slow_query_ms'] = self.slow_query_ms
+        snapshot['repeated_threshold'] = self.repeated_threshold
+        return snapshot
+
+# Shared instance, initialised in app.create_app() like the other extensions
+query_stats = QueryStats()
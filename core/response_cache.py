@@ -0,0 +1,353 @@
+import functools
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import g, request, session, make_response
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+# Cached pages contain the CSRF token of whoever rendered them first. It is swapped for
+# this placeholder when the page is stored, and for the visitor's own token when served.
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF_TOKEN__'
+
+# Response headers kept with a cached page, so hits can still answer conditional requests with 304
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+def ensure_private_dir(directory, setting):
+    """Creates `directory` with mode 700 if needed, and refuses one other local users could write into.
+
+    Cached files are served as-is, so a writable cache directory would let
+    any local user publish content. `setting` names the config key in errors.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if not stat.S_ISDIR(st.st_mode):
+        raise ValueError(f"{setting} '{directory}' is not a directory.")
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise ValueError(f"{setting} '{directory}' is owned by another user.")
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ValueError(f"{setting} '{directory}' is writable by group or others; chmod it to 700.")
+
+class MemoryBackend:
+    """Per-process LRU store for cached pages."""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._data = OrderedDict() # (namespace, path, query_string) -> entry
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_path(self, namespace, path):
+        """Drops every cached variant (query string) of one page."""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == namespace and k[1] == path]:
+                del self._data[key]
+
+    def delete_namespace(self, namespace):
+        """Drops every cached page of one namespace (blog)."""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == namespace]:
+                del self._data[key]
+
+    def size(self):
+        return len(self._data)
+
+class FileSystemBackend:
+    """Stores cached pages as files under `directory`, shared by all workers on the host.
+
+    Layout: <directory>/<sha1(namespace)>/<sha1(path)>/<sha1(query_string)>.page
+    Each file is one line of JSON (status, headers, expiry...) followed by the raw body,
+    so reading a page never deserializes anything executable. A file's mtime is set to
+    its expiry time, so prune() can find expired and oldest pages without opening them.
+
+    Args:
+        max_files: Pages kept on disk; every PRUNE_EVERY stores, expired pages are removed
+                   and then the soonest-expiring ones until the cache is back under the cap.
+    """
+
+    PRUNE_EVERY = 100 # Stores (per worker) between two prune() passes
+
+    def __init__(self, directory, max_files=10000):
+        if not directory:
+            raise ValueError("PAGE_CACHE_DIR must be set to use the filesystem page cache.")
+        self.directory = directory
+        ensure_private_dir(directory, 'PAGE_CACHE_DIR')
+        self.max_files = max_files
+        self._stores = itertools.count(1)
+        self._prune_lock = threading.Lock()
+        self.pruned = 0
+
+    @staticmethod
+    def _hash(value):
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def _namespace_dir(self, namespace):
+        return os.path.join(self.directory, self._hash(namespace or '_'))
+
+    def _path_dir(self, namespace, path):
+        return os.path.join(self._namespace_dir(namespace), self._hash(path))
+
+    def _file(self, key):
+        namespace, path, query_string = key
+        return os.path.join(self._path_dir(namespace, path), self._hash(query_string) + '.page')
+
+    def get(self, key):
+        filename = self._file(key)
+        try:
+            with open(filename, 'rb') as f:
+                entry = json.loads(f.readline())
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] <= time.time():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            return None
+        entry['headers'] = [tuple(header) for header in entry['headers']]
+        return entry
+
+    def set(self, key, entry):
+        filename = self._file(key)
+        os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+        meta = {name: value for name, value in entry.items() if name != 'body'}
+        # Write to a temp file and rename, so readers never see a half-written page
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(filename))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+                f.write(entry['body'])
+            os.utime(tmp_name, (entry['expires_at'], entry['expires_at']))
+            os.replace(tmp_name, filename)
+        except OSError:
+            try:
+                os.remove(tmp_name)
+            except OSError:
+                pass
+            raise
+        if next(self._stores) % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Deletes expired pages, then the soonest-expiring ones while more than max_files remain."""
+        if not self._prune_lock.acquire(blocking=False):
+            return # Another thread of this worker is already pruning
+        try:
+            now = time.time()
+            pages = [] # (expires_at, filename) of live pages
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    filename = os.path.join(root, name)
+                    try:
+                        mtime = os.stat(filename).st_mtime # The expiry time, see set()
+                    except OSError:
+                        continue # Removed meanwhile (invalidation or another worker)
+                    if not name.endswith('.page'):
+                        if mtime < now - 60:
+                            self._remove(filename) # Temp file left by a crashed write
+                    elif mtime <= now:
+                        self._remove(filename)
+                    else:
+                        pages.append((mtime, filename))
+            if len(pages) > self.max_files:
+                pages.sort()
+                for _, filename in pages[:len(pages) - self.max_files]:
+                    self._remove(filename)
+        finally:
+            self._prune_lock.release()
+
+    def _remove(self, filename):
+        try:
+            os.remove(filename)
+            self.pruned += 1
+        except OSError:
+            pass
+
+    def delete_path(self, namespace, path):
+        shutil.rmtree(self._path_dir(namespace, path), ignore_errors=True)
+
+    def delete_namespace(self, namespace):
+        shutil.rmtree(self._namespace_dir(namespace), ignore_errors=True)
+
+    def size(self):
+        return sum(len(files) for _, _, files in os.walk(self.directory))
+
+class ResponseCache:
+    """Full-page cache for anonymous GET requests, keyed by blog subdomain + path + the query arguments the view reads.
+
+    Configured from app config in init_app():
+        PAGE_CACHE_BACKEND: 'memory' (default), 'filesystem' or 'none'
+        PAGE_CACHE_TTL: Seconds a page stays cached (default 60)
+        PAGE_CACHE_SIZE: Max pages kept by the memory backend (default 1000)
+        PAGE_CACHE_DIR: Directory for the filesystem backend (required; created with mode 700)
+        PAGE_CACHE_MAX_FILES: Max pages kept by the filesystem backend (default 10000)
+
+    The memory backend is per worker, so invalidations only reach the worker
+    that made the write; other workers converge within PAGE_CACHE_TTL. Use
+    the filesystem backend for immediate invalidation across workers.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0, 'invalidations': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        self.ttl = int(app.config.get('PAGE_CACHE_TTL', 60))
+        if backend == 'memory':
+            self.backend = MemoryBackend(maxsize=int(app.config.get('PAGE_CACHE_SIZE', 1000)))
+        elif backend == 'filesystem':
+            self.backend = FileSystemBackend(app.config.get('PAGE_CACHE_DIR'), max_files=int(app.config.get('PAGE_CACHE_MAX_FILES', 10000)))
+        elif backend in (None, '', 'none'):
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown PAGE_CACHE_BACKEND '{backend}'. Use 'memory', 'filesystem' or 'none'.")
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _key(query_args):
+        # Only the arguments the view reads: /?x=1, /?x=2... all share the page of /
+        query = urlencode([(name, request.args[name]) for name in query_args if name in request.args])
+        return (g.get('subdomain') or '', request.path, query)
+
+    def _is_cacheable_request(self):
+        if self.backend is None or request.method not in ('GET', 'HEAD'):
+            return False
+        if current_user.is_authenticated:
+            return False # Logged-in pages carry per-user navbar/admin content
+        if session.get('_flashes'):
+            return False # The page must be rendered to show (and consume) flashed messages
+        return True
+
+    def set_meta(self, **meta):
+        """Attaches JSON-serializable data to the page being rendered; it is handed to on_hit() when the page is served from cache."""
+        g.setdefault('page_cache_meta', {}).update(meta)
+
+    def cached(self, on_hit=None, query_args=()):
+        """Decorator caching a view's response for anonymous GET requests.
+
+        Args:
+            on_hit: Optional callable receiving the page's meta dict (see set_meta)
+                    whenever the page is served from cache, e.g. to count a view.
+            query_args: Names of the query string arguments the view reads (e.g. ('before', 'after')).
+                        They alone make up the cache key; any other argument shares the plain page.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._is_cacheable_request():
+                    self._count('bypassed')
+                    return view(*args, **kwargs)
+
+                key = self._key(query_args)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count('hits')
+                    if on_hit is not None:
+                        on_hit(entry['meta'])
+                    response = self._build_response(entry)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count('misses')
+                response = make_response(view(*args, **kwargs))
+                if request.method == 'GET' and response.status_code == 200 and not response.is_streamed:
+                    self._store(key, response)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def _store(self, key, response):
+        body = response.get_data()
+        csrf_token = g.get('csrf_token') # Set by Flask-WTF if the page rendered a token
+        if csrf_token:
+            body = body.replace(csrf_token.encode('utf-8'), CSRF_PLACEHOLDER)
+        entry = {
+            'body': body,
+            'status': response.status_code,
+            'content_type': response.content_type,
+            'headers': [(name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers],
+            'meta': dict(g.get('page_cache_meta') or {}),
+            'stored_at': time.time(),
+            'expires_at': time.time() + self.ttl,
+        }
+        try:
+            self.backend.set(key, entry)
+            self._count('stored')
+        except OSError as e:
+            print(f"Warning: could not store page in cache: {e}")
+
+    @staticmethod
+    def _build_response(entry):
+        body = entry['body']
+        if CSRF_PLACEHOLDER in body:
+            body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode('utf-8'))
+        response = make_response(body, entry['status'])
+        response.content_type = entry['content_type']
+        for name, value in entry.get('headers', []):
+            response.headers[name] = value
+        return response.make_conditional(request) # 304 if the client's validators still match
+
+    def invalidate_page(self, namespace, path):
+        """Drops one page (all query string variants) of a blog, e.g. ('myblog', '/posts/hello')."""
+        if self.backend is not None:
+            self.backend.delete_path(namespace or '', path)
+            self._count('invalidations')
+
+    def invalidate_namespace(self, namespace):
+        """Drops every cached page of a blog."""
+        if self.backend is not None:
+            self.backend.delete_namespace(namespace or '')
+            self._count('invalidations')
+
+    def stats(self):
+        """Returns hit/miss counters and the number of cached pages."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['backend'] = type(self.backend).__name__ if self.backend is not None else None
+        snapshot['size'] = self.backend.size() if self.backend is not None else 0
+        snapshot['ttl'] = self.ttl
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
+
+# Shared instance, initialised in app.create_app() like the other extensions
+page_cache = ResponseCache()
@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+class SamplePool:
+    """Keeps an in-memory pool of candidates and draws random subsets from it.
+
+    Replaces `ORDER BY RAND() LIMIT k` queries: the pool is reloaded by
+    `loader()` at most once every `refresh_interval` seconds (or on the next
+    draw after invalidate()), and each draw is a random.sample() in O(k).
+
+    With `fetch`, the pool holds only the ids of every candidate (e.g. an
+    array('q'), 8 bytes per row) and each draw looks up the k picked ids,
+    so every row has the same chance however large the table grows.
+
+    Args:
+        loader: Callable returning the candidate rows (or ids, with fetch).
+        fetch: Optional callable turning a list of picked ids into rows.
+        refresh_interval: Maximum age of the pool, in seconds.
+        name: Label used in stats output.
+    """
+
+    def __init__(self, loader, fetch=None, refresh_interval=60, name=None):
+        self.loader = loader
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.name = name
+        self._rows = []
+        self._loaded_at = None # time.monotonic() of the last successful or failed load
+        self._stale = False
+        self._refresh_lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'draws': 0, 'last_refresh_duration': 0.0, 'last_error': None}
+
+    def sample(self, k):
+        """Returns up to `k` distinct random rows from the pool."""
+        self._ensure_fresh()
+        rows = self._rows # Snapshot: a concurrent refresh swaps the list, never mutates it
+        self._stats['draws'] += 1
+        picked = random.sample(rows, min(k, len(rows)))
+        if self.fetch is None or not picked:
+            return picked
+        fetched = list(self.fetch(picked))
+        random.shuffle(fetched) # Lookups come back in id order
+        return fetched
+
+    def invalidate(self):
+        """Marks the pool stale so the next draw reloads it."""
+        self._stale = True
+
+    def _ensure_fresh(self):
+        if not self._stale and self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        # Only the first load blocks; afterwards one thread refreshes while the others keep drawing from the old pool
+        if not self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._stale or self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self):
+        """Reloads the pool. On failure the previous rows are kept until the next interval."""
+        started = time.monotonic()
+        self._stale = False
+        try:
+            self._rows = self.loader() or [] # A new sequence each load: draws in progress keep the old one
+            self._stats['last_error'] = None
+        except Exception as e:
+            print(f"Error refreshing sample pool '{self.name}': {e}")
+            self._stats['last_error'] = str(e)
+        finally:
+            self._loaded_at = time.monotonic()
+            self._stats['refreshes'] += 1
+            self._stats['last_refresh_duration'] = self._loaded_at - started
+
+    def stats(self):
+        """Returns the pool size, its age in seconds and refresh counters."""
+        snapshot = dict(self._stats)
+        snapshot['name'] = self.name
+        snapshot['size'] = len(self._rows)
+        snapshot['age'] = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        snapshot['refresh_interval'] = self.refresh_interval
+        snapshot['stale'] = self._stale
+        return snapshot
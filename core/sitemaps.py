@@ -0,0 +1,236 @@
+import hashlib
+import math
+import os
+import shutil
+import tempfile
+import time
+from datetime import timezone
+from xml.sax.saxutils import escape
+from dotenv import load_dotenv
+from flask import Response, stream_with_context
+from .db_utils import release_request_connections
+from .response_cache import ensure_private_dir
+from .http_utils import not_modified_response, set_validators
+
+# Load environment variables from .env file
+load_dotenv()
+
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# The sitemaps protocol caps one file at 50,000 URLs; bigger blogs are split into shards
+SITEMAP_SHARD_SIZE = min(int(os.getenv('SITEMAP_SHARD_SIZE', 45000)), 49000) # Leaves room for the non-post pages of shard 1
+SITEMAP_CHUNK_SIZE = int(os.getenv('SITEMAP_CHUNK_SIZE', 1000)) # Rows read per keyset query
+SITEMAP_WRITE_SIZE = 64 * 1024 # Bytes buffered before a chunk is sent to the client
+
+def shard_count(post_count):
+    """Number of sitemap shards of a blog with `post_count` published posts (at least one, for the homepage)."""
+    return max(math.ceil(post_count / SITEMAP_SHARD_SIZE), 1)
+
+def _lastmod(value):
+    """W3C datetime for <lastmod>. Naive datetimes from MySQL are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _buffered(parts):
+    """Joins small string parts into ~SITEMAP_WRITE_SIZE byte chunks, so the server isn't asked to write per URL."""
+    buffer, size = [], 0
+    for part in parts:
+        data = part.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= SITEMAP_WRITE_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def _entries(tag, urls):
+    for loc, lastmod in urls:
+        if lastmod is not None:
+            yield f'<{tag}><loc>{escape(loc)}</loc><lastmod>{_lastmod(lastmod)}</lastmod></{tag}>\n'
+        else:
+            yield f'<{tag}><loc>{escape(loc)}</loc></{tag}>\n'
+
+def urlset(urls):
+    """Streams a <urlset> sitemap as byte chunks.
+
+    Args:
+        urls: Iterable of (absolute URL, last modification datetime or None); consumed lazily.
+    """
+    def parts():
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+        yield from _entries('url', urls)
+        yield '</urlset>\n'
+    return _buffered(parts())
+
+def sitemap_index(sitemaps):
+    """Streams a <sitemapindex> listing other sitemaps, from (absolute URL, lastmod) pairs."""
+    def parts():
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+        yield from _entries('sitemap', sitemaps)
+        yield '</sitemapindex>\n'
+    return _buffered(parts())
+
+class ShardCache:
+    """Optional on-disk cache of generated sitemap files, shared by all workers on the host.
+
+    Layout: <directory>/<sha1(namespace)>/<name>.xml, with files written under
+    <directory>/tmp first and a <sha1(namespace)>.gen stamp that invalidate()
+    replaces. Disabled (everything is generated on each request) when no
+    directory is configured.
+
+    Args:
+        directory: Cache directory (created with mode 700, refused if other users can write to it), or None to disable caching.
+        ttl: Seconds a cached file is served before it is regenerated.
+    """
+
+    def __init__(self, directory=None, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        if directory:
+            ensure_private_dir(directory, 'SITEMAP_CACHE_DIR')
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _namespace_dir(self, namespace):
+        return os.path.join(self.directory, hashlib.sha1(namespace.encode('utf-8')).hexdigest())
+
+    def _generation(self, namespace):
+        """Returns the namespace's current generation stamp ('' until its first invalidation)."""
+        try:
+            with open(self._namespace_dir(namespace) + '.gen') as f:
+                return f.read()
+        except OSError:
+            return ''
+
+    def _fresh_file(self, namespace, name):
+        filename = os.path.join(self._namespace_dir(namespace), f"{name}.xml")
+        try:
+            if os.path.getmtime(filename) + self.ttl > time.time():
+                return filename
+        except OSError:
+            pass
+        return None
+
+    def stream(self, namespace, name, generate):
+        """Yields the cached file's chunks if fresh, else the chunks of `generate()` while writing them to the cache.
+
+        The file only replaces the cached one once generation completed, so a
+        client disconnecting mid-stream never leaves a truncated sitemap behind.
+        A file whose namespace was invalidated while it was generated is dropped
+        instead, since it may predate the write that invalidated it.
+        """
+        if not self.enabled:
+            yield from generate()
+            return
+        filename = self._fresh_file(namespace, name)
+        try:
+            cached = open(filename, 'rb') if filename is not None else None
+        except OSError:
+            cached = None # Removed by an invalidation meanwhile, regenerate below
+        if cached is not None:
+            with cached: # An open file stays readable even if invalidated mid-stream
+                while True:
+                    data = cached.read(SITEMAP_WRITE_SIZE)
+                    if not data:
+                        return
+                    yield data
+        generation = self._generation(namespace)
+        try:
+            tmp_dir = os.path.join(self.directory, 'tmp') # Outside the namespace dir invalidate() removes
+            os.makedirs(tmp_dir, mode=0o700, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=tmp_dir, suffix='.tmp')
+        except OSError as e:
+            print(f"Warning: could not cache sitemap: {e}")
+            yield from generate()
+            return
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for data in generate():
+                    f.write(data)
+                    yield data
+            completed = True
+        finally:
+            if completed:
+                self._store(namespace, name, tmp_name, generation)
+            else:
+                self._discard(tmp_name)
+
+    def _store(self, namespace, name, tmp_name, generation):
+        """Moves a generated file into place unless the namespace was invalidated since `generation` was read."""
+        if self._generation(namespace) != generation:
+            self._discard(tmp_name)
+            return
+        directory = self._namespace_dir(namespace)
+        filename = os.path.join(directory, f"{name}.xml")
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            os.replace(tmp_name, filename)
+        except OSError as e:
+            print(f"Warning: could not cache sitemap: {e}") # The client already has the whole body
+            self._discard(tmp_name)
+            return
+        # An invalidation between the check above and the rename must not leave this file behind
+        if self._generation(namespace) != generation:
+            self._discard(filename)
+
+    @staticmethod
+    def _discard(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def invalidate(self, namespace):
+        """Drops every cached file of one namespace (a blog subdomain, or the platform index).
+
+        The generation stamp is replaced first, so files still being generated
+        from the old data are not moved into place afterwards.
+        """
+        if not self.enabled:
+            return
+        stamp = self._namespace_dir(namespace) + '.gen'
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(os.urandom(8).hex())
+            os.replace(tmp_name, stamp)
+        except OSError as e:
+            print(f"Warning: could not invalidate sitemap cache: {e}")
+        shutil.rmtree(self._namespace_dir(namespace), ignore_errors=True)
+
+sitemap_cache = ShardCache(os.getenv('SITEMAP_CACHE_DIR') or None, ttl=int(os.getenv('SITEMAP_CACHE_TTL', 3600)))
+
+PLATFORM_SITEMAP_NAMESPACE = '_platform'
+
+def invalidate_blog_sitemaps(subdomain):
+    """Drops a blog's cached shards and the platform index listing them (call after post writes)."""
+    sitemap_cache.invalidate(subdomain)
+    sitemap_cache.invalidate(PLATFORM_SITEMAP_NAMESPACE)
+
+def sitemap_etag(*parts):
+    """ETag from the aggregates a sitemap is derived from (counts, timestamps, shard number)."""
+    raw = '|'.join(str(part) for part in (SITEMAP_SHARD_SIZE,) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def sitemap_response(chunks, etag, last_modified=None):
+    """Streams a sitemap, or answers 304 if the client's validators still match.
+
+    Args:
+        chunks: Callable returning the byte chunks (only called when the body is needed).
+        etag: Validator computed from cheap aggregates, since the body isn't known up front.
+    """
+    response = not_modified_response(etag, last_modified, public=True)
+    if response is None:
+        # The body reads its chunks on short-lived connections: hand the request's connection back
+        # now rather than at teardown, which only runs once a (possibly slow) client has the whole file.
+        # stream_with_context still keeps the request context for url_for() while the body is generated.
+        release_request_connections()
+        response = Response(stream_with_context(chunks()), content_type=SITEMAP_CONTENT_TYPE)
+        set_validators(response, etag, last_modified, public=True)
+    return response
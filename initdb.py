@@ -10,6 +10,8 @@ load_dotenv()
 from werkzeug.security import generate_password_hash
 # For slug generation (if needed, or use a simpler one)
 import re
+# Listing excerpt stored with each post
+from blog_instance.services import summarize_content
 
 DB_HOST = os.getenv('MYSQL_HOST', 'localhost')
 DB_USER = os.getenv('MYSQL_USER', 'dangocan')
@@ -131,10 +133,13 @@ def main():
             
             default_post_content = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur. Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum.'
             
-            sql_insert_post = "INSERT INTO posts (blog_id, user_id, title, slug, content, is_published) VALUES (%s, %s, %s, %s, %s, %s)"
-            post_values = (default_blog_id, default_user_id, default_post_title, default_post_slug, default_post_content, True)
+            default_post_excerpt, default_post_word_count = summarize_content(default_post_content)
+
+            sql_insert_post = "INSERT INTO posts (blog_id, user_id, title, slug, content, excerpt, word_count, is_published) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+            post_values = (default_blog_id, default_user_id, default_post_title, default_post_slug, default_post_content, default_post_excerpt, default_post_word_count, True)
             cursor_db.execute(sql_insert_post, post_values)
             default_post_id = cursor_db.lastrowid
+            cursor_db.execute("UPDATE blogs SET post_count = post_count + 1, content_version = content_version + 1 WHERE id = %s", (default_blog_id,))
             print(f"Default post '{default_post_title}' created with ID: {default_post_id} for blog ID: {default_blog_id}")
 
             cnx_db.commit()
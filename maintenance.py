@@ -0,0 +1,103 @@
+import argparse
+import itertools
+import os
+from dotenv import load_dotenv
+from blog_instance import db as blog_db
+from blog_instance.services import summarize_content
+from core.html_utils import render_post_html, content_render_key
+from core.db_utils import transaction
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
+
+# Maintenance jobs for the main database. Run from the project root, e.g.:
+#   python maintenance.py reconcile-likes
+#   python maintenance.py reconcile-likes --batch-size 5000
+#   python maintenance.py backfill-excerpts
+#   python maintenance.py render-posts [--force]
+#   python maintenance.py reconcile-tags
+#   python maintenance.py reconcile-blogs
+
+def reconcile_likes(batch_size):
+    """Recomputes posts.like_count from the likes table, batch_size post ids at a time."""
+    id_range = blog_db.get_post_id_range(DB_NAME)
+    if not id_range or id_range['min_id'] is None:
+        print("No posts, nothing to reconcile.")
+        return 0
+    corrected = 0
+    # Small id ranges keep each UPDATE's row locks short while the site is live
+    for first_id in range(id_range['min_id'], id_range['max_id'] + 1, batch_size):
+        corrected += blog_db.reconcile_like_counts(DB_NAME, first_id, first_id + batch_size - 1)
+    print(f"Like counts reconciled: {corrected} post(s) corrected.")
+    return corrected
+
+def backfill_excerpts(batch_size):
+    """Recomputes the stored excerpt and word count of every post, batch_size posts at a time."""
+    updated = 0
+    posts = blog_db.iter_posts(DB_NAME, batch_size) # Streamed: writes go through other pooled connections
+    while True:
+        batch = list(itertools.islice(posts, batch_size))
+        if not batch:
+            break
+        blog_db.set_post_excerpts(DB_NAME, [summarize_content(post['content']) + (post['id'],) for post in batch])
+        updated += len(batch)
+    print(f"Excerpts backfilled: {updated} post(s) updated.")
+    return updated
+
+def render_posts(batch_size, force=False):
+    """Stores the current render of every post whose stored HTML is missing or stale (all posts with force)."""
+    rendered = 0
+    for post in blog_db.iter_posts(DB_NAME, batch_size):
+        key = content_render_key(post['content'])
+        if force or post['content_html_key'] != key:
+            blog_db.set_post_html(DB_NAME, post['id'], render_post_html(post['content']), key)
+            rendered += 1
+    print(f"Post HTML rendered: {rendered} post(s) updated.")
+    return rendered
+
+def reconcile_tags():
+    """Rebuilds tag_usage and tags.usage_count from post_tags in one transaction."""
+    with transaction(DB_NAME): # Readers see the old counts until the rebuild commits
+        rows = blog_db.rebuild_tag_usage(DB_NAME)
+    print(f"Tag usage rebuilt: {rows} (blog, tag) count(s).")
+    return rows
+
+def reconcile_blogs():
+    """Fixes drift between blogs.post_count and the posts table."""
+    corrected = blog_db.rebuild_blog_post_counts(DB_NAME)
+    print(f"Blog post counts reconciled: {corrected} blog(s) corrected.")
+    return corrected
+
+def main():
+    parser = argparse.ArgumentParser(description='Calimara database maintenance jobs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    reconcile_parser = subparsers.add_parser('reconcile-likes', help='Fix drift between posts.like_count and the likes table.')
+    reconcile_parser.add_argument('--batch-size', type=int, default=1000, help='Post ids per UPDATE (default 1000).')
+
+    backfill_parser = subparsers.add_parser('backfill-excerpts', help='Recompute posts.excerpt and posts.word_count.')
+    backfill_parser.add_argument('--batch-size', type=int, default=500, help='Posts fetched per round trip (default 500).')
+
+    render_parser = subparsers.add_parser('render-posts', help='Pre-render post HTML (after a renderer change or for old posts).')
+    render_parser.add_argument('--batch-size', type=int, default=500, help='Posts fetched per round trip (default 500).')
+    render_parser.add_argument('--force', action='store_true', help='Re-render posts whose stored render looks current too.')
+
+    subparsers.add_parser('reconcile-tags', help='Rebuild tag usage counts from post_tags.')
+    subparsers.add_parser('reconcile-blogs', help='Fix drift between blogs.post_count and the posts table.')
+
+    args = parser.parse_args()
+    if args.command == 'reconcile-likes':
+        reconcile_likes(args.batch_size)
+    elif args.command == 'backfill-excerpts':
+        backfill_excerpts(args.batch_size)
+    elif args.command == 'render-posts':
+        render_posts(args.batch_size, args.force)
+    elif args.command == 'reconcile-tags':
+        reconcile_tags()
+    elif args.command == 'reconcile-blogs':
+        reconcile_blogs()
+
+if __name__ == '__main__':
+    main()
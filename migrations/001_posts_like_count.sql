@@ -0,0 +1,11 @@
+-- Adds the denormalized like counter to posts and fills it from the likes table.
+-- The backfill keeps last_modified_timestamp (ON UPDATE CURRENT_TIMESTAMP), counting likes is not an edit.
+-- Apply once to databases created before the column existed, e.g.:
+--   mysql calimara_db < migrations/001_posts_like_count.sql
+-- Later drift can be fixed with: python maintenance.py reconcile-likes
+
+ALTER TABLE posts ADD COLUMN like_count INT NOT NULL DEFAULT 0 AFTER view_count;
+
+UPDATE posts p
+JOIN (SELECT post_id, COUNT(*) AS like_count FROM likes GROUP BY post_id) l ON l.post_id = p.id
+SET p.like_count = l.like_count, p.last_modified_timestamp = p.last_modified_timestamp;
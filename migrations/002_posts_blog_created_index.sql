@@ -0,0 +1,5 @@
+-- Per-blog post listings (admin dashboard, blog index) sort by creation time within one blog.
+-- Apply once to databases created before the index existed, e.g.:
+--   mysql calimara_db < migrations/002_posts_blog_created_index.sql
+
+ALTER TABLE posts ADD INDEX idx_posts_blog_created (blog_id, creation_timestamp);
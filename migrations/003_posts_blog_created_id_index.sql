@@ -0,0 +1,5 @@
+-- Makes the per-blog listing index match the blog index keyset, (blog_id, creation_timestamp, id).
+-- Apply once after 002, e.g.:
+--   mysql calimara_db < migrations/003_posts_blog_created_id_index.sql
+
+ALTER TABLE posts DROP INDEX idx_posts_blog_created, ADD INDEX idx_posts_blog_created (blog_id, creation_timestamp, id);
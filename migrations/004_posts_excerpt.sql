@@ -0,0 +1,8 @@
+-- Adds the stored listing excerpt and word count to posts.
+-- Apply once, then fill the columns for existing posts:
+--   mysql calimara_db < migrations/004_posts_excerpt.sql
+--   python maintenance.py backfill-excerpts
+
+ALTER TABLE posts
+    ADD COLUMN excerpt VARCHAR(255) NOT NULL DEFAULT '' AFTER content,
+    ADD COLUMN word_count INT NOT NULL DEFAULT 0 AFTER excerpt;
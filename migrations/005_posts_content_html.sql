@@ -0,0 +1,8 @@
+-- Adds the stored, sanitized HTML render of post bodies.
+-- Apply once, then optionally pre-render existing posts (otherwise they render on first view):
+--   mysql calimara_db < migrations/005_posts_content_html.sql
+--   python maintenance.py render-posts
+
+ALTER TABLE posts
+    ADD COLUMN content_html MEDIUMTEXT NULL AFTER word_count,
+    ADD COLUMN content_html_key CHAR(40) NULL AFTER content_html;
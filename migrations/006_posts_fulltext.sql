@@ -0,0 +1,6 @@
+-- Adds the FULLTEXT index used by blog and platform search.
+-- Apply once, e.g.:
+--   mysql calimara_db < migrations/006_posts_fulltext.sql
+-- Building it reads every post; run it outside peak hours on large databases.
+
+ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_title_content (title, content);
@@ -0,0 +1,28 @@
+-- Adds maintained tag usage counts (per blog and global) and the (tag_id, post_id) index for tag pages.
+-- Apply once, e.g.:
+--   mysql calimara_db < migrations/007_tag_usage.sql
+-- Counts can be rebuilt later with: python maintenance.py reconcile-tags
+
+ALTER TABLE tags ADD COLUMN usage_count INT NOT NULL DEFAULT 0, ADD INDEX (usage_count);
+
+ALTER TABLE post_tags ADD INDEX idx_post_tags_tag (tag_id, post_id);
+
+CREATE TABLE IF NOT EXISTS tag_usage (
+    blog_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    post_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (blog_id, tag_id),
+    INDEX idx_tag_usage_cloud (blog_id, post_count),
+    FOREIGN KEY (blog_id) REFERENCES blogs(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO tag_usage (blog_id, tag_id, post_count)
+SELECT p.blog_id, pt.tag_id, COUNT(*)
+FROM post_tags pt
+JOIN posts p ON p.id = pt.post_id
+GROUP BY p.blog_id, pt.tag_id;
+
+UPDATE tags t
+JOIN (SELECT tag_id, SUM(post_count) AS post_count FROM tag_usage GROUP BY tag_id) u ON u.tag_id = t.id
+SET t.usage_count = u.post_count;
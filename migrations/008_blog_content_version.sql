@@ -0,0 +1,15 @@
+-- Adds a stored post count and a content version to blogs, so blog index and sitemap
+-- validators are one primary key lookup instead of a COUNT/MAX over the blog's posts.
+-- Post writes bump them in the same transaction (blog_instance/db.py touch_blog).
+-- Apply once, e.g.:
+--   mysql calimara_db < migrations/008_blog_content_version.sql
+-- Counts can be rebuilt later with: python maintenance.py reconcile-blogs
+
+ALTER TABLE blogs
+    ADD COLUMN post_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN content_version INT NOT NULL DEFAULT 0,
+    ADD COLUMN last_changed DATETIME DEFAULT CURRENT_TIMESTAMP;
+
+UPDATE blogs b
+LEFT JOIN (SELECT blog_id, COUNT(*) AS post_count, MAX(last_modified_timestamp) AS last_modified FROM posts GROUP BY blog_id) p ON p.blog_id = b.id
+SET b.post_count = COALESCE(p.post_count, 0), b.last_changed = COALESCE(p.last_modified, b.creation_date);
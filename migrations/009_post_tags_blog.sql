@@ -0,0 +1,14 @@
+-- Copies each post's blog_id onto post_tags and indexes (blog_id, tag_id, post_id), so a blog's
+-- tag page seeks straight to its own posts instead of walking the tag's posts on every blog.
+-- Apply once, e.g.:
+--   mysql calimara_db < migrations/009_post_tags_blog.sql
+
+ALTER TABLE post_tags ADD COLUMN blog_id INT NULL;
+
+UPDATE post_tags pt
+JOIN posts p ON p.id = pt.post_id
+SET pt.blog_id = p.blog_id;
+
+ALTER TABLE post_tags
+    MODIFY blog_id INT NOT NULL,
+    ADD INDEX idx_post_tags_blog_tag (blog_id, tag_id, post_id);
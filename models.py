@@ -1,6 +1,24 @@
 import os
 from flask_login import UserMixin
 from core.db_utils import execute_query # Assuming execute_query is general enough
+from core.cache_utils import TTLCache
+
+# Cache of users rows, so authenticated requests don't re-SELECT the user on every page view.
+# Keys carry USER_CACHE_VERSION: bump it whenever the cached columns change and every
+# worker stops reading the old entries. Call invalidate_user_cache() after writing to a user.
+USER_CACHE_VERSION = 1
+user_cache = TTLCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 4096)),
+    ttl=int(os.getenv('USER_CACHE_TTL', 300)),
+    name='users'
+)
+
+def _user_cache_key(user_id):
+    return (USER_CACHE_VERSION, str(user_id))
+
+def invalidate_user_cache(user_id):
+    """Drops the cached row of a user. Call this whenever a users row is updated."""
+    user_cache.invalidate(_user_cache_key(user_id))
 
 class User(UserMixin):
     def __init__(self, user_id):
@@ -11,14 +29,15 @@ class User(UserMixin):
         self.load_data_from_db()
 
     def load_data_from_db(self):
-        """Loads user attributes from the main users table."""
+        """Loads user attributes from the main users table (through user_cache)."""
         db_name = os.getenv('MYSQL_DATABASE', 'calimara_db')
-        user_data = execute_query(
+        user_data = user_cache.get_or_load(_user_cache_key(self.id), lambda: execute_query(
             db_name, 
             "SELECT username, email FROM users WHERE id = %s",
             (self.id,),
-            one=True
-        )
+            one=True,
+            prepared=True # Hot query, see core.db_utils
+        ))
         if user_data:
             self.username = user_data['username']
             self.email = user_data['email']
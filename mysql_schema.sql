@@ -4,6 +4,7 @@ SET FOREIGN_KEY_CHECKS = 0;
 
 DROP TABLE IF EXISTS likes;
 DROP TABLE IF EXISTS comments;
+DROP TABLE IF EXISTS tag_usage;
 DROP TABLE IF EXISTS post_tags;
 DROP TABLE IF EXISTS tags;
 DROP TABLE IF EXISTS posts;
@@ -28,6 +29,9 @@ CREATE TABLE IF NOT EXISTS blogs (
     owner_user_id INT NOT NULL,
     owner_email VARCHAR(255) UNIQUE NOT NULL,
     creation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    post_count INT NOT NULL DEFAULT 0, -- Maintained with the posts, see touch_blog()
+    content_version INT NOT NULL DEFAULT 0, -- Bumped by every post write; part of the index/sitemap ETags
+    last_changed DATETIME DEFAULT CURRENT_TIMESTAMP, -- Time of the last post write
     INDEX (subdomain_name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -38,30 +42,53 @@ CREATE TABLE IF NOT EXISTS posts (
     title VARCHAR(255) NOT NULL,
     slug VARCHAR(255) NOT NULL,
     content TEXT NOT NULL,
+    excerpt VARCHAR(255) NOT NULL DEFAULT '', -- Plain-text preview for listings, see services.summarize_content
+    word_count INT NOT NULL DEFAULT 0,
+    content_html MEDIUMTEXT NULL, -- Sanitized render of content, see core/html_utils.py
+    content_html_key CHAR(40) NULL, -- content_render_key() the render was made from
     creation_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     last_modified_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     is_published BOOLEAN DEFAULT TRUE,
     view_count INT DEFAULT 0,
+    like_count INT NOT NULL DEFAULT 0, -- Maintained by add_like, see maintenance.py reconcile-likes
     FOREIGN KEY (blog_id) REFERENCES blogs(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE (blog_id, slug),
-    INDEX (creation_timestamp)
+    INDEX (creation_timestamp),
+    INDEX idx_posts_blog_created (blog_id, creation_timestamp, id), -- Per-blog listings and keyset pages, newest first
+    FULLTEXT INDEX ft_posts_title_content (title, content) -- Blog and platform search
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 CREATE TABLE IF NOT EXISTS tags (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) UNIQUE NOT NULL,
-    slug VARCHAR(255) UNIQUE NOT NULL
+    slug VARCHAR(255) UNIQUE NOT NULL,
+    usage_count INT NOT NULL DEFAULT 0, -- Posts carrying the tag, all blogs (see tag_usage)
+    INDEX (usage_count)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 CREATE TABLE IF NOT EXISTS post_tags (
     post_id INT NOT NULL,
     tag_id INT NOT NULL,
+    blog_id INT NOT NULL, -- The post's blog, for per-blog tag pages
     PRIMARY KEY (post_id, tag_id),
+    INDEX idx_post_tags_tag (tag_id, post_id), -- Platform tag pages, newest post first
+    INDEX idx_post_tags_blog_tag (blog_id, tag_id, post_id), -- Blog tag pages, newest post first
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
     FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Posts per (blog, tag), maintained with post_tags writes (see blog_instance/db.py adjust_tag_usage)
+CREATE TABLE IF NOT EXISTS tag_usage (
+    blog_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    post_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (blog_id, tag_id),
+    INDEX idx_tag_usage_cloud (blog_id, post_count),
+    FOREIGN KEY (blog_id) REFERENCES blogs(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 CREATE TABLE IF NOT EXISTS comments (
     id INT AUTO_INCREMENT PRIMARY KEY,
     post_id INT NOT NULL,
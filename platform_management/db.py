@@ -1,7 +1,10 @@
 import mysql.connector
 import os
+from array import array
 from datetime import datetime, timedelta
 from core.db_utils import execute_query, get_db_connection
+from core.cache_utils import TTLCache
+from core.sampling import SamplePool
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -10,8 +13,18 @@ load_dotenv()
 # Get MySQL database name from environment variables
 MAIN_DB_NAME = os.getenv('MYSQL_DATABASE', 'calimara_db')
 
+# Subdomain -> blog context cache used by app.load_blog_instance_context on every request.
+# Unknown subdomains are cached too (negative_ttl) so probing bots don't hit the database.
+# Invalidation is per worker, so the negative TTL is kept short.
+blog_context_cache = TTLCache(
+    maxsize=int(os.getenv('BLOG_CACHE_SIZE', 2048)),
+    ttl=int(os.getenv('BLOG_CACHE_TTL', 300)),
+    negative_ttl=int(os.getenv('BLOG_CACHE_NEGATIVE_TTL', 30)),
+    name='blog_context'
+)
+
 def add_blog_instance_record(subdomain_name, blog_title, owner_user_id, owner_email):
-    """Adds a new blog instance record to the main database."""
+    """Adds a new blog instance record to the main database. Call invalidate_random_blogs() once it is committed."""
     query = """
     INSERT INTO blogs (subdomain_name, blog_title, owner_user_id, owner_email)
     VALUES (%s, %s, %s, %s)
@@ -23,10 +36,68 @@ def get_blog_by_subdomain(subdomain_name):
     """Retrieves a blog record from the main database by subdomain."""
     query = "SELECT * FROM blogs WHERE subdomain_name = %s"
     args = (subdomain_name,)
-    return execute_query(MAIN_DB_NAME, query, args, one=True)
+    return execute_query(MAIN_DB_NAME, query, args, one=True, prepared=True)
+
+def get_blog_context_by_subdomain(subdomain_name):
+    """Returns the id, subdomain_name and owner_user_id of a blog (cached), or None if it doesn't exist."""
+    key = subdomain_name.lower()
+    return blog_context_cache.get_or_load(key, lambda: execute_query(
+        MAIN_DB_NAME,
+        "SELECT id, subdomain_name, owner_user_id FROM blogs WHERE subdomain_name = %s",
+        (subdomain_name,),
+        one=True,
+        prepared=True
+    ))
+
+def invalidate_blog_context(subdomain_name):
+    """Drops a subdomain from the blog context cache (e.g. after the blog is created)."""
+    blog_context_cache.invalidate(subdomain_name.lower())
+
+def get_blog_sitemap_stats(after_blog_id, limit, conn=None):
+    """Retrieves the next `limit` blogs by id with their stored post count and last post change (platform sitemap index).
+
+    Args:
+        conn: Optional connection to run on instead of the request's (used while streaming).
+    """
+    query = """
+    SELECT id, subdomain_name, post_count, last_changed AS last_modified
+    FROM blogs
+    WHERE id > %s
+    ORDER BY id
+    LIMIT %s
+    """
+    args = (after_blog_id, limit)
+    return execute_query(conn or MAIN_DB_NAME, query, args, many=True)
+
+def get_sitemap_index_validators():
+    """Cheap validators for the platform sitemap index: blog count and newest shared post (both indexed).
+
+    Post edits don't change them; their new <lastmod> shows once cached copies expire.
+    """
+    query = """
+    SELECT (SELECT COUNT(*) FROM blogs) AS blog_count,
+           (SELECT MAX(post_creation_date) FROM shared_posts_index) AS last_modified
+    """
+    return execute_query(MAIN_DB_NAME, query, one=True)
+
+def get_recent_shared_posts(limit):
+    """Retrieves the newest entries of the shared posts index (platform feed)."""
+    query = """
+    SELECT id, original_post_id_on_instance, blog_instance_subdomain, post_title, post_creation_date, post_link
+    FROM shared_posts_index
+    ORDER BY post_creation_date DESC, id DESC
+    LIMIT %s
+    """
+    args = (limit,)
+    return execute_query(MAIN_DB_NAME, query, args, many=True)
 
 def add_post_to_shared_index(original_post_id_on_instance, blog_instance_subdomain, post_title, post_creation_date, post_link):
-    """Adds a post entry to the shared posts index."""
+    """Adds a post entry to the shared posts index.
+
+    Call invalidate_shared_post_samples() and invalidate_platform_feed() once it is
+    committed: invalidating inside the transaction lets a concurrent request reload
+    them without the new post and keep that copy cached.
+    """
     query = """
     INSERT INTO shared_posts_index (original_post_id_on_instance, blog_instance_subdomain, post_title, post_creation_date, post_link)
     VALUES (%s, %s, %s, %s, %s)
@@ -34,34 +105,85 @@ def add_post_to_shared_index(original_post_id_on_instance, blog_instance_subdoma
     args = (original_post_id_on_instance, blog_instance_subdomain, post_title, post_creation_date, post_link)
     execute_query(MAIN_DB_NAME, query, args, commit=True)
 
+# Sidebar sample pools: the ids of all candidate rows are reloaded every SAMPLE_POOL_REFRESH seconds,
+# random ids are drawn in memory and only those rows are read, instead of running ORDER BY RAND().
+SAMPLE_POOL_REFRESH = int(os.getenv('SAMPLE_POOL_REFRESH', 60))
+
+_shared_post_pools = {} # time_frame_days -> SamplePool
+
+def _load_ids(query, args=()):
+    """Streams a single-column id query into a compact array."""
+    return array('q', (row[0] for row in execute_query(MAIN_DB_NAME, query, args, stream=True, row_format='tuple')))
+
+def _load_recent_shared_post_ids(time_frame_days):
+    """Loads the ids of every shared index entry within the time frame (reads the post_creation_date index only)."""
+    since = datetime.now() - timedelta(days=time_frame_days)
+    query = "SELECT id FROM shared_posts_index WHERE post_creation_date >= %s"
+    return _load_ids(query, (since.strftime('%Y-%m-%d %H:%M:%S'),))
+
+def _fetch_shared_posts(ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    query = f"SELECT post_title, post_link, blog_instance_subdomain FROM shared_posts_index WHERE id IN ({placeholders})"
+    return execute_query(MAIN_DB_NAME, query, tuple(ids), many=True)
+
+def _fetch_blogs(ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    query = f"SELECT subdomain_name, blog_title FROM blogs WHERE id IN ({placeholders})"
+    return execute_query(MAIN_DB_NAME, query, tuple(ids), many=True)
+
+random_blogs_pool = SamplePool(lambda: _load_ids("SELECT id FROM blogs"), fetch=_fetch_blogs,
+                               refresh_interval=SAMPLE_POOL_REFRESH, name='random_blogs')
+
+def _shared_post_pool(time_frame_days):
+    pool = _shared_post_pools.get(time_frame_days)
+    if pool is None:
+        pool = _shared_post_pools.setdefault(time_frame_days, SamplePool(
+            lambda: _load_recent_shared_post_ids(time_frame_days),
+            fetch=_fetch_shared_posts,
+            refresh_interval=SAMPLE_POOL_REFRESH,
+            name=f'random_posts_{time_frame_days}d'
+        ))
+    return pool
+
+def invalidate_shared_post_samples():
+    """Marks the random posts pools stale (call after the shared index changes)."""
+    for pool in list(_shared_post_pools.values()):
+        pool.invalidate()
+
+def invalidate_random_blogs():
+    """Marks the random blogs pool stale (call after a blog is created)."""
+    random_blogs_pool.invalidate()
+
+def get_sample_pool_stats():
+    """Returns size and refresh age of every sample pool in this worker."""
+    pools = [random_blogs_pool] + list(_shared_post_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
 def get_random_posts_from_shared_index(limit=10, time_frame_days=30):
     """Retrieves random posts from the shared index within a time frame."""
-    one_month_ago = datetime.now() - timedelta(days=time_frame_days)
-    query = """
-    SELECT post_title, post_link, blog_instance_subdomain
-    FROM shared_posts_index
-    WHERE post_creation_date >= %s
-    ORDER BY RAND()
-    LIMIT %s
-    """
-    args = (one_month_ago.strftime('%Y-%m-%d %H:%M:%S'), limit)
-    return execute_query(MAIN_DB_NAME, query, args, many=True)
+    return _shared_post_pool(time_frame_days).sample(limit)
 
 def get_random_blogs(limit=10):
     """Retrieves a list of random blogs."""
-    query = """
-    SELECT subdomain_name, blog_title
-    FROM blogs
-    ORDER BY RAND()
-    LIMIT %s
-    """
-    args = (limit,)
-    return execute_query(MAIN_DB_NAME, query, args, many=True)
+    return random_blogs_pool.sample(limit)
+
+# Owner -> blog cache behind the navbar (inject_user_blog) and the platform login/index redirects.
+# "Owns no blog" is cached briefly; creating a blog invalidates the owner's entry.
+owner_blog_cache = TTLCache(
+    maxsize=int(os.getenv('OWNER_BLOG_CACHE_SIZE', 4096)),
+    ttl=int(os.getenv('OWNER_BLOG_CACHE_TTL', 300)),
+    negative_ttl=int(os.getenv('OWNER_BLOG_CACHE_NEGATIVE_TTL', 30)),
+    name='owner_blog'
+)
 
 def get_blog_by_owner_id(owner_user_id):
-    """Retrieves a blog record from the main database by owner_user_id."""
+    """Retrieves a blog record from the main database by owner_user_id (cached)."""
     query = "SELECT id, subdomain_name, blog_title FROM blogs WHERE owner_user_id = %s LIMIT 1" # Assuming one blog per user for now
     args = (owner_user_id,)
-    return execute_query(MAIN_DB_NAME, query, args, one=True)
+    return owner_blog_cache.get_or_load(int(owner_user_id), lambda: execute_query(MAIN_DB_NAME, query, args, one=True, prepared=True))
+
+def invalidate_owner_blog(owner_user_id):
+    """Drops the cached blog of an owner (e.g. after they create one)."""
+    owner_blog_cache.invalidate(int(owner_user_id))
 
 # Add other main database interaction functions as needed
@@ -1,13 +1,29 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, session
 from .forms import BlogRegistrationForm, PlatformLoginForm # Removed SubdomainPromptForm
-from .services import create_new_blog_instance 
-from .db import get_blog_by_subdomain, get_blog_by_owner_id 
-from blog_instance.services import authenticate_user # For global login
+from .services import create_new_blog_instance, get_user_blog, get_platform_feed, iter_blog_sitemaps
+from .db import get_blog_by_subdomain, get_sitemap_index_validators
+from blog_instance.services import authenticate_user, search_posts, get_tag_cloud, get_tag_page # For global login, search and tag pages
 from models import User # For login_user
 from flask_login import login_user, logout_user, current_user, login_required # Added login_required
+from core.feeds import feed_response
+from core.sitemaps import sitemap_cache, sitemap_etag, sitemap_response, sitemap_index, PLATFORM_SITEMAP_NAMESPACE
 
 platform_bp = Blueprint('platform', __name__)
 
+def _blog_url(subdomain, path):
+    """Absolute URL of a page on a blog's subdomain, for platform pages linking into many blogs."""
+    base_domain_parts = current_app.config.get('BASE_DOMAIN', 'localhost:5000').split(':')
+    port_str = f":{base_domain_parts[1]}" if len(base_domain_parts) > 1 else ""
+    return f"http://{subdomain}.{base_domain_parts[0]}{port_str}{path}"
+
+def _post_url(subdomain, slug):
+    """Absolute URL of a post on its blog's subdomain."""
+    return _blog_url(subdomain, f"/posts/{slug}")
+
+def _sitemap_url(subdomain, shard):
+    """Absolute URL of a blog's sitemap shard (see blog.sitemap)."""
+    return _blog_url(subdomain, '/sitemap.xml' if shard == 1 else f"/sitemap-{shard}.xml")
+
 @platform_bp.route('/')
 def index():
     """Main platform homepage."""
@@ -19,7 +35,7 @@ def index():
         # but an explicit check of g.is_blog_instance could be added for safety if needed.
         # For now, we assume this route is only hit for the main platform.
         
-        user_blog = get_blog_by_owner_id(current_user.id)
+        user_blog = get_user_blog(current_user.id)
         if user_blog:
             # User owns a blog, redirect to their blog's admin dashboard.
             subdomain = user_blog['subdomain_name']
@@ -36,6 +52,51 @@ def index():
                            random_posts=g.get('random_posts', []), 
                            random_blogs_list=g.get('random_blogs_list', [])) # Added random_blogs_list
 
+@platform_bp.route('/feed.xml')
+def feed():
+    """Atom feed of the newest posts across all blogs, from shared_posts_index."""
+    return feed_response(get_platform_feed(url_for('platform.index', _external=True),
+                                           url_for('platform.feed', _external=True)))
+
+@platform_bp.route('/sitemap.xml')
+def sitemap():
+    """Streams the sitemap index listing every blog's sitemap shards."""
+    validators = get_sitemap_index_validators()
+    generate = lambda: sitemap_index(iter_blog_sitemaps(_sitemap_url))
+    return sitemap_response(lambda: sitemap_cache.stream(PLATFORM_SITEMAP_NAMESPACE, 'index', generate),
+                            sitemap_etag('index', validators['blog_count'], validators['last_modified']),
+                            validators['last_modified'])
+
+@platform_bp.route('/search')
+def search():
+    """Searches posts of every blog on the platform (?q=words&page=N)."""
+    search_results = search_posts(g.db_name, request.args.get('q', ''),
+                                  request.args.get('page', 1, type=int), current_app.config['SEARCH_RESULTS_PER_PAGE'])
+    for result in search_results['results']:
+        result['url'] = _post_url(result['subdomain_name'], result['slug']) # Results live on their blog's subdomain
+    return render_template('platform/search.html', search=search_results,
+                           random_posts=g.get('random_posts', []),
+                           random_blogs_list=g.get('random_blogs_list', []))
+
+@platform_bp.route('/tags')
+def tag_cloud():
+    """Tag cloud of the whole platform, from the maintained tags.usage_count."""
+    return render_template('platform/tags.html', tags=get_tag_cloud(g.db_name),
+                           random_posts=g.get('random_posts', []),
+                           random_blogs_list=g.get('random_blogs_list', []))
+
+@platform_bp.route('/tags/<tag_slug>')
+def tag_posts(tag_slug):
+    """Posts of every blog carrying a tag, newest first (?before=<post id> for older pages)."""
+    tag_page = get_tag_page(g.db_name, tag_slug, request.args.get('before'), current_app.config['BLOG_POSTS_PER_PAGE'])
+    if tag_page is None or not tag_page['post_count']:
+        return "Tag not found", 404
+    for post in tag_page['posts']:
+        post['url'] = _post_url(post['subdomain_name'], post['slug'])
+    return render_template('platform/tag.html', tag_page=tag_page,
+                           random_posts=g.get('random_posts', []),
+                           random_blogs_list=g.get('random_blogs_list', []))
+
 @platform_bp.route('/register-blog', methods=['GET', 'POST'])
 def register_blog():
     """Blog registration page."""
@@ -81,7 +142,7 @@ def login(): # Renamed from platform_login_prompt
     """Platform-wide login page."""
     if current_user.is_authenticated:
         # If already logged in, try to find their blog and redirect to its dashboard
-        user_blog = get_blog_by_owner_id(current_user.id)
+        user_blog = get_user_blog(current_user.id)
         if user_blog:
             subdomain = user_blog['subdomain_name']
             base_domain_parts = current_app.config.get('BASE_DOMAIN', 'localhost:5000').split(':')
@@ -100,7 +161,7 @@ def login(): # Renamed from platform_login_prompt
             flash('Logged in successfully.', 'success')
             
             # Find user's blog
-            user_blog = get_blog_by_owner_id(user_id) # New DB function needed
+            user_blog = get_user_blog(user_id) # New DB function needed
             if user_blog:
                 # Construct subdomain URL carefully
                 subdomain = user_blog['subdomain_name']
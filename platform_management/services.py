@@ -3,9 +3,13 @@ import mysql.connector
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
 from config import Config
-from core.db_utils import init_db_from_schema, execute_query
+from core.db_utils import init_db_from_schema, execute_query, transaction, pooled_connection
 from core.mail_utils import send_email
-from .db import add_blog_instance_record, get_blog_by_subdomain # Import from local db module
+from core.sitemaps import shard_count, SITEMAP_CHUNK_SIZE
+from core.feeds import feed_cache, PLATFORM_FEED_KEY, atom_entry, atom_feed, cached_entry, tag_uri
+from models import invalidate_user_cache
+from flask import g, current_app
+from .db import add_blog_instance_record, invalidate_random_blogs, get_blog_by_subdomain, get_blog_by_owner_id, invalidate_blog_context, invalidate_owner_blog, get_recent_shared_posts, get_blog_sitemap_stats, MAIN_DB_NAME # Import from local db module
 import shutil # Import shutil for directory removal
 
 def create_new_blog_instance(subdomain, blog_title, owner_username, owner_email, password):
@@ -65,32 +69,42 @@ def create_new_blog_instance(subdomain, blog_title, owner_username, owner_email,
             pass # User creation will happen below if not existing, or fail on unique email if it does.
 
         hashed_password = generate_password_hash(password)
-        # Add the blog owner user to the main 'users' table
-        # The 'users' table in mysql_schema.sql does not have 'blog_title'
-        owner_user_id = execute_query(
-            main_db_name,
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (owner_username, owner_email, hashed_password),
-            commit=True,
-            last_row_id=True
-        )
-        if owner_user_id is None:
-             # This could happen if the email/username already exists due to UNIQUE constraints
-             # Try to fetch the user ID if insert failed due to existing user
-             existing_user_by_email = execute_query(main_db_name, "SELECT id FROM users WHERE email = %s", (owner_email,), one=True)
-             if existing_user_by_email:
-                 owner_user_id = existing_user_by_email['id']
-                 print(f"User with email {owner_email} already exists, using ID: {owner_user_id}")
-             else:
-                raise Exception("Could not create or find user, and failed to get user ID.")
-
-        # 3. Add record to the main 'blogs' database
-        add_blog_instance_record(
-            subdomain_name=subdomain,
-            blog_title=blog_title,
-            owner_user_id=owner_user_id, # Store the user ID from the instance DB
-            owner_email=owner_email
-        )
+        # User and blog rows are created together, so a failure never leaves an orphaned user behind
+        with transaction(main_db_name):
+            # Add the blog owner user to the main 'users' table
+            # The 'users' table in mysql_schema.sql does not have 'blog_title'
+            owner_user_id = execute_query(
+                main_db_name,
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (owner_username, owner_email, hashed_password),
+                commit=True,
+                last_row_id=True
+            )
+            if owner_user_id is None:
+                 # This could happen if the email/username already exists due to UNIQUE constraints
+                 # Try to fetch the user ID if insert failed due to existing user
+                 existing_user_by_email = execute_query(main_db_name, "SELECT id FROM users WHERE email = %s", (owner_email,), one=True)
+                 if existing_user_by_email:
+                     owner_user_id = existing_user_by_email['id']
+                     print(f"User with email {owner_email} already exists, using ID: {owner_user_id}")
+                 else:
+                    raise Exception("Could not create or find user, and failed to get user ID.")
+
+            # 3. Add record to the main 'blogs' database
+            add_blog_instance_record(
+                subdomain_name=subdomain,
+                blog_title=blog_title,
+                owner_user_id=owner_user_id, # Store the user ID from the instance DB
+                owner_email=owner_email
+            )
+
+        # The subdomain may be negatively cached from an earlier visit, and the owner
+        # may be an existing user whose row is already cached
+        invalidate_blog_context(subdomain)
+        invalidate_random_blogs() # After the commit, so a concurrent reload can't miss the new blog
+        invalidate_user_cache(owner_user_id)
+        invalidate_owner_blog(owner_user_id)
+        g.pop('_user_blogs', None)
 
         # 6. Send confirmation email
         try:
@@ -130,6 +144,63 @@ def create_new_blog_instance(subdomain, blog_title, owner_username, owner_email,
 
         raise Exception(f"Blog creation failed: {e}") # Re-raise the original exception
 
+def get_user_blog(user_id):
+    """Returns the blog owned by `user_id`, looked up at most once per request.
+
+    The navbar context processor and the platform views both need this, so
+    the result is memoized on g on top of the cross-request owner_blog_cache.
+    """
+    memo = g.setdefault('_user_blogs', {})
+    key = int(user_id)
+    if key not in memo:
+        memo[key] = get_blog_by_owner_id(key)
+    return memo[key]
+
+PLATFORM_FEED_SIZE = 50 # Newest posts across all blogs
+
+def get_platform_feed(site_url, feed_url):
+    """Returns the platform-wide Atom feed built from shared_posts_index, cached until the next shared post write.
+
+    Args:
+        site_url: Absolute URL of the platform homepage.
+        feed_url: Absolute URL of the feed itself.
+    """
+    return feed_cache.get_or_load(PLATFORM_FEED_KEY, lambda: _build_platform_feed(site_url, feed_url))
+
+def _build_platform_feed(site_url, feed_url):
+    host = current_app.config.get('BASE_DOMAIN', 'localhost:5000').split(':')[0]
+    rows = get_recent_shared_posts(PLATFORM_FEED_SIZE)
+    entries = []
+    for row in rows:
+        # Same entry id as on the blog's own feed, so readers subscribed to both can deduplicate
+        key = ('shared', row['id'], row['post_title'], row['post_creation_date'], row['post_link'])
+        entries.append(cached_entry(key, lambda row=row: atom_entry(
+            tag_uri(host, f"{row['blog_instance_subdomain']}/post/{row['original_post_id_on_instance']}"),
+            row['post_title'], row['post_link'], row['post_creation_date'], row['post_creation_date'],
+            author=row['blog_instance_subdomain'])))
+    updated = rows[0]['post_creation_date'] if rows else datetime.now() # Newest first
+    return atom_feed(tag_uri(host, 'feed'), 'Calimara', feed_url, site_url, updated, entries)
+
+def iter_blog_sitemaps(sitemap_url):
+    """Yields (URL, lastmod) for every sitemap shard of every blog, reading blogs in keyset chunks.
+
+    Args:
+        sitemap_url: Callable (subdomain, shard number) -> absolute URL of that shard.
+
+    Each chunk is read on a short-lived pooled connection, returned before the chunk is yielded.
+    """
+    after_id = 0
+    while True:
+        with pooled_connection(MAIN_DB_NAME) as conn:
+            blogs = get_blog_sitemap_stats(after_id, SITEMAP_CHUNK_SIZE, conn=conn)
+            conn.commit() # End the read snapshot before the connection goes back to the pool
+        for blog in blogs:
+            for shard in range(1, shard_count(blog['post_count']) + 1):
+                yield sitemap_url(blog['subdomain_name'], shard), blog['last_modified']
+        if len(blogs) < SITEMAP_CHUNK_SIZE:
+            return
+        after_id = blogs[-1]['id']
+
 # Add other platform-level service functions here (e.g., webhook handlers)
 
 # Helper function to verify reCAPTCHA (if not using Flask-WTF's built-in validation)
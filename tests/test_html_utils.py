@@ -0,0 +1,54 @@
+import unittest
+
+from core.html_utils import _is_safe_url, sanitize_html
+
+
+class SafeUrlTests(unittest.TestCase):
+
+    def test_allowed_schemes(self):
+        for url in ('http://example.com', 'HTTPS://example.com/a?b=c', 'mailto:me@example.com'):
+            self.assertTrue(_is_safe_url(url), url)
+
+    def test_relative_urls(self):
+        for url in ('', '/posts/1', '//example.com/x', '#top', '?page=2', 'post.html', 'a/b:c', 'page?x=a:b'):
+            self.assertTrue(_is_safe_url(url), url)
+
+    def test_script_schemes_are_rejected(self):
+        for url in ('javascript:alert(1)', ' JavaScript:alert(1)', 'java\tscript:alert(1)',
+                    'jav\nascript:alert(1)', '\x01javascript:alert(1)', 'data:text/html,x',
+                    'vbscript:x', 'a:b/c'):
+            self.assertFalse(_is_safe_url(url), repr(url))
+
+
+class SanitizeHtmlUrlTests(unittest.TestCase):
+
+    def assertHrefDropped(self, href):
+        html = sanitize_html(f'<p><a href="{href}">x</a></p>')
+        self.assertNotIn('href', html, href)
+        self.assertNotIn('script', html.lower(), href)
+
+    def test_tab_entity_in_scheme(self):
+        self.assertHrefDropped('java&#x09;script:alert(1)')
+
+    def test_newline_entity_in_scheme(self):
+        self.assertHrefDropped('jav&#x0A;ascript:alert(1)')
+
+    def test_leading_control_character(self):
+        self.assertHrefDropped('&#x01;javascript:alert(1)')
+
+    def test_entity_encoded_colon(self):
+        self.assertHrefDropped('javascript&#58;alert(1)')
+        self.assertHrefDropped('javascript&#x3A;alert(1)')
+        self.assertHrefDropped('javascript&colon;alert(1)')
+
+    def test_img_src(self):
+        self.assertNotIn('src', sanitize_html('<img src="java&#x09;script:alert(1)">'))
+
+    def test_safe_links_are_kept(self):
+        html = sanitize_html('<p><a href="https://example.com/a?b=1&amp;c=2">x</a> <a href="/about">y</a></p>')
+        self.assertIn('href="https://example.com/a?b=1&amp;c=2"', html)
+        self.assertIn('href="/about"', html)
+
+
+if __name__ == '__main__':
+    unittest.main()